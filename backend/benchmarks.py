@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the backend's hot functions.
+
+Usage:
+    python benchmarks.py                  # run and compare against the stored baseline
+    python benchmarks.py --save           # run and overwrite the stored baseline
+    python benchmarks.py -k parse_excel   # only benchmarks whose name contains the filter
+
+Everything runs in-process against generated fixtures, no database or
+network needed. Exits with status 1 when a benchmark is slower than its
+baseline by more than --threshold.
+
+Each result is stored with the time of a fixed calibration workload measured
+right around it, and comparisons are scaled by how fast that workload runs
+now. A baseline recorded on another machine, or while this one was busier,
+still points at code regressions.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from io import BytesIO
+from pathlib import Path
+
+# The server module connects lazily, so a placeholder URL is enough offline
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'quiz_benchmarks')
+# Journal cost is measured explicitly by the journaled benchmarks below
+os.environ['JOURNAL_ENABLED'] = 'false'
+# Measure the hot paths, not the INFO-level request logging
+os.environ['LOG_LEVEL'] = 'WARNING'
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+import openpyxl
+from openpyxl.styles import PatternFill
+
+import server
+
+BASELINE_PATH = Path(__file__).parent / 'benchmark_baseline.json'
+
+# Fixtures
+
+def make_workbook(rows: int) -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["ID", "Question", "Option A", "Option B", "Option C", "Option D", "Duration (seconds)", "Points"])
+    red_fill = PatternFill(start_color="FFFF0000", end_color="FFFF0000", fill_type="solid")
+    for i in range(rows):
+        ws.append([f"Q{i}", f"Question {i}?", "Alpha", "Beta", "Gamma", "Delta", 30, 10])
+        ws.cell(row=i + 2, column=3 + i % 4).fill = red_fill
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def make_questions(count: int):
+    return [server.QuizQuestion(
+        id=f"Q{i}", question=f"Question {i}?", option_a="Alpha", option_b="Beta",
+        option_c="Gamma", option_d="Delta", correct_answer="ABCD"[i % 4], duration=30, points=10
+    ).dict() for i in range(count)]
+
+def reset_state(player_count: int = 0, question_count: int = 10):
+    server.players.clear()
+    server.apply_upload("benchmark", make_questions(question_count))
+    for i in range(player_count):
+        sid = f"sid-{i}"
+        server.apply_join(sid, server.Player(id=sid, name=f"Player {i}", score=(i * 7919) % 1000).dict())
+    server.apply_start(server.datetime.now(server.timezone.utc))
+
+def open_journal():
+    """Point the server at a fresh journal in a temporary directory."""
+    close_journal()
+    server.journal = server.QuizJournal(tempfile.mkdtemp(prefix="quiz-journal-"), server.JOURNAL_SNAPSHOT_EVERY)
+    server.journal.open()
+    return server.journal
+
+def close_journal():
+    if server.journal.directory != server.JOURNAL_DIR:
+        server.journal.close()
+        shutil.rmtree(server.journal.directory, ignore_errors=True)
+
+def dumps(payload) -> str:
+    return json.dumps(payload, default=server._json_default)
+
+class Benchmark:
+    """``setup()`` builds the fixture passed to ``operation()``.
+
+    A stateful benchmark gets a fresh fixture before every sample, and
+    ``ops`` divides each sample so results read as time per operation.
+    ``teardown()`` releases a fixture once it is no longer used, untimed.
+    """
+
+    def __init__(self, setup, operation, ops: int = 1, stateful: bool = False, teardown=None):
+        self.setup = setup
+        self.operation = operation
+        self.ops = ops
+        self.stateful = stateful
+        self.teardown = teardown or (lambda _: None)
+
+def bench_parse_excel(rows):
+    return Benchmark(lambda: make_workbook(rows), server.parse_excel_file)
+
+def bench_submit_answers(answers, journaled=False):
+    def setup():
+        reset_state(player_count=answers)
+        if journaled:
+            open_journal()
+        else:
+            close_journal()
+        return asyncio.new_event_loop()
+
+    def run(loop):
+        async def answer_all():
+            for i in range(answers):
+                await server.submit_answer(f"sid-{i}", {"answer": "ABCD"[i % 4]})
+        loop.run_until_complete(answer_all())
+
+    def teardown(loop):
+        loop.close()
+        close_journal()
+    return Benchmark(setup, run, ops=answers, stateful=True, teardown=teardown)
+
+def bench_journal_snapshot(player_count):
+    """Event-loop side of a snapshot; encoding and writing happen on the journal thread."""
+    def setup():
+        reset_state(player_count=player_count)
+        return open_journal()
+    return Benchmark(setup, lambda journal: journal.snapshot(), stateful=True, teardown=lambda _: close_journal())
+
+def bench_scores(player_count):
+    def setup():
+        reset_state(player_count=player_count)
+    return Benchmark(setup, lambda _: server.build_scores())
+
+def bench_question_payload():
+    def setup():
+        reset_state()
+    return Benchmark(setup, lambda _: dumps(server.question_payload(0)))
+
+def bench_player_joined_payload(player_count):
+    def setup():
+        reset_state(player_count=player_count)
+        return server.players["sid-0"]
+    return Benchmark(setup, lambda player: dumps({"player": player, "players": list(server.players.values())}))
+
+BENCHMARKS = {
+    "parse_excel_file[100]": bench_parse_excel(100),
+    "parse_excel_file[1000]": bench_parse_excel(1000),
+    "parse_excel_file[10000]": bench_parse_excel(10000),
+    "generate_template_excel": Benchmark(lambda: None, lambda _: server.generate_template_excel()),
+    "render_qr_code": Benchmark(lambda: f"http://{server.get_local_ip()}:3000/join", server.render_qr_code),
+    "submit_answer[10000]": bench_submit_answers(10000),
+    "submit_answer_journaled[10000]": bench_submit_answers(10000, journaled=True),
+    "journal_snapshot[10000]": bench_journal_snapshot(10000),
+    "scores_sort[1000]": bench_scores(1000),
+    "scores_sort[10000]": bench_scores(10000),
+    "scores_sort[100000]": bench_scores(100000),
+    "question_payload": bench_question_payload(),
+    "player_joined_payload[1000]": bench_player_joined_payload(1000),
+}
+
+def measure(benchmark: Benchmark, min_time: float, min_repeats: int):
+    """Return the median seconds per operation and the number of samples."""
+    argument = benchmark.setup()
+    benchmark.operation(argument)  # warm-up
+    samples = []
+    elapsed = 0.0
+    while len(samples) < min_repeats or elapsed < min_time:
+        if benchmark.stateful:
+            benchmark.teardown(argument)
+            argument = benchmark.setup()
+        started = time.perf_counter()
+        benchmark.operation(argument)
+        sample = time.perf_counter() - started
+        elapsed += sample
+        samples.append(sample / benchmark.ops)
+    benchmark.teardown(argument)
+    return statistics.median(samples), len(samples)
+
+def calibration_workload(_):
+    """Fixed mix of the work the hot paths do: building dicts, sorting, encoding JSON."""
+    rows = [{"id": f"sid-{i}", "score": (i * 7919) % 1000} for i in range(2000)]
+    rows.sort(key=lambda row: row["score"], reverse=True)
+    json.dumps(rows)
+
+CALIBRATION = Benchmark(lambda: None, calibration_workload)
+
+def measure_calibrated(benchmark: Benchmark, min_time: float, min_repeats: int):
+    """Like measure(), plus the calibration time around it to normalize against."""
+    before, _ = measure(CALIBRATION, 0.1, min_repeats)
+    seconds, samples = measure(benchmark, min_time, min_repeats)
+    after, _ = measure(CALIBRATION, 0.1, min_repeats)
+    return seconds, samples, (before + after) / 2
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+def main():
+    parser = argparse.ArgumentParser(description="Run backend micro-benchmarks")
+    parser.add_argument("-k", "--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative slowdown that counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds spent per benchmark")
+    parser.add_argument("--min-repeats", type=int, default=5, help="Minimum samples per benchmark")
+    args = parser.parse_args()
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline = stored.get("results", {})
+    baseline_calibration = stored.get("calibration", {})
+    if baseline:
+        if not baseline_calibration:
+            print("Warning: the baseline has no calibration, comparing raw times\n")
+        host = (platform.python_version(), platform.machine())
+        if host != (stored.get("python"), stored.get("machine")):
+            print(f"Warning: baseline recorded with Python {stored.get('python')} on {stored.get('machine')}, "
+                  f"running Python {host[0]} on {host[1]}; interpreter changes do not scale uniformly\n")
+
+    results = {}
+    calibration = {}
+    regressions = []
+    print(f"{'benchmark':<30} {'median/op':>12} {'baseline':>12} {'change':>9}  {'host':>6}  samples")
+    for name, benchmark in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        seconds, samples, calibration[name] = measure_calibrated(benchmark, args.min_time, args.min_repeats)
+        results[name] = seconds
+
+        previous = baseline.get(name)
+        # Baseline time as it would be on this host right now
+        scale = calibration[name] / baseline_calibration[name] if name in baseline_calibration else 1.0
+        change, flag = "", ""
+        if previous:
+            previous *= scale
+            ratio = seconds / previous - 1
+            change = f"{ratio:+.1%}"
+            if ratio > args.threshold:
+                flag = "  REGRESSION"
+                regressions.append(name)
+        print(f"{name:<30} {format_seconds(seconds):>12} "
+              f"{format_seconds(previous) if previous else '-':>12} {change:>9}  {1 / scale:>5.2f}x  {samples}{flag}")
+
+    close_journal()
+
+    if args.save:
+        args.baseline.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "calibration": {**baseline_calibration, **calibration},
+            "results": {**baseline, **results}
+        }, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
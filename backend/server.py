@@ -1,14 +1,24 @@
-from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import socketio
 import os
 import logging
+import logging.handlers
+import queue
+import random
 import asyncio
+import aiohttp
+import contextvars
+import threading
+import hashlib
+import heapq
 import json
 import socket
+import sys
+import time
 import qrcode
 from io import BytesIO
 from pathlib import Path
@@ -19,19 +29,159 @@ from datetime import datetime, timezone
 import openpyxl
 from openpyxl.styles import PatternFill
 import base64
+from bisect import bisect_left, insort
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Logging: records are queued by the caller and written as JSON lines by a
+# listener thread, so a burst of log calls never blocks the event loop
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+# Fraction of records kept per high-volume event type, e.g. "connect=0.1,answer=0.01";
+# "request" is uvicorn's access log, one record per HTTP request or Socket.IO poll
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', 'connect=0.1,disconnect=0.1,answer=0.01,request=0.1')
+
+sid_var = contextvars.ContextVar("sid", default=None)
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the room, quiz, socket and request they belong to."""
+
+    def filter(self, record):
+        # Logging is configured before the room and quiz state exist, so records
+        # emitted while the module is still loading go out without them
+        state = globals().get("quiz_state")
+        record.room = globals().get("ROOM_ID")
+        record.quiz_id = state["quiz_id"] if state else None
+        record.sid = getattr(record, "sid", None) or sid_var.get()
+        record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keeps a configurable fraction of records tagged with a high-volume event.
+
+    Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self.dropped = {}  # {event: records sampled out}
+
+    def keep(self, event: Optional[str], level: int) -> bool:
+        rate = self.rates.get(event)
+        if rate is None or rate >= 1 or level >= logging.WARNING or random.random() < rate:
+            return True
+        self.dropped[event] = self.dropped.get(event, 0) + 1
+        return False
+
+    def filter(self, record):
+        if getattr(record, "presampled", False):
+            return True
+        return self.keep(getattr(record, "event", None), record.levelno)
+
+class EventFilter(logging.Filter):
+    """Tags every record of a logger we do not own with an event, so it can be sampled."""
+
+    def __init__(self, event: str):
+        super().__init__()
+        self.event = event
+
+    def filter(self, record):
+        record.event = self.event
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Drops records instead of blocking or erroring when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    FIELDS = ("event", "room", "quiz_id", "sid", "request_id")
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return json.dumps(entry, default=str)
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+def configure_logging():
+    """Route the root logger through a bounded queue to a JSON stdout listener."""
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(sampling_filter)
+    queue_handler.addFilter(ContextFilter())
+    
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    logging.getLogger("uvicorn.access").addFilter(EventFilter("request"))
+    adopt_uvicorn_loggers()
+    return queue_handler, listener
+
+def adopt_uvicorn_loggers():
+    """Send uvicorn's records through the queue instead of its own synchronous stdout handlers."""
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+sampling_filter = SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES))
+log_queue_handler, log_listener = configure_logging()
+logger = logging.getLogger(__name__)
+
+def log_event(event: str, msg: str, *args, level: int = logging.INFO, sid: Optional[str] = None):
+    """Log a high-volume event, sampling it before any record is built."""
+    if logger.isEnabledFor(level) and sampling_filter.keep(event, level):
+        logger.log(level, msg, *args, extra={"event": event, "sid": sid, "presampled": True})
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+class SocketJson:
+    """json stand-in for Socket.IO so payloads can carry datetimes, e.g. a player's joined_at."""
+    loads = staticmethod(json.loads)
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return json.dumps(obj, default=_json_default, **kwargs)
+
 # Create Socket.IO server
 sio = socketio.AsyncServer(
     async_mode='asgi',
-    cors_allowed_origins="*"
+    cors_allowed_origins="*",
+    json=SocketJson
 )
 
 # Create the main app without a prefix
@@ -43,6 +193,10 @@ api_router = APIRouter(prefix="/api")
 # Quiz state and player management
 quiz_state = {
     "status": "waiting",  # waiting, lobby, active, paused, finished
+    "mode": "host",  # host: everyone follows /next-question, self_paced: per-player cursors
+    "sync_reveal": False,  # pre-distribute masked questions and reveal them with a key broadcast
+    "finished_at": None,  # epoch seconds, drives archiving and eviction of the finished session
+    "archived": False,
     "current_question": 0,
     "questions": [],
     "quiz_id": None,
@@ -52,6 +206,52 @@ quiz_state = {
 
 players = {}  # {session_id: player_data}
 
+# Self-paced mode bookkeeping
+player_cursors = {}  # {session_id: index of the question the player is on}
+question_progress = []  # players currently on each question, last slot counts finished players
+
+SELF_PACED_GRACE = float(os.environ.get('SELF_PACED_GRACE', '1.0'))  # seconds of network slack per deadline
+PROGRESS_BROADCAST_INTERVAL = float(os.environ.get('PROGRESS_BROADCAST_INTERVAL', '1.0'))
+
+# Tournaments aggregate scores from many rooms; each server process hosts one room
+ROOM_ID = os.environ.get('ROOM_ID') or f"{socket.gethostname()}-{os.getpid()}"
+TOURNAMENT_FLUSH_INTERVAL = float(os.environ.get('TOURNAMENT_FLUSH_INTERVAL', '1.0'))
+TOURNAMENT_TOP_MAX = 1000  # largest standings page a client may ask for
+
+tournaments = {}  # {tournament_id: Tournament} hosted by this process
+tournament_link = {"tournament_id": None, "hub_url": None}  # where this room reports its scores
+
+# Background jobs: heavy work runs on a bounded worker pool, never on the event loop
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+JOB_RETENTION = float(os.environ.get('JOB_RETENTION', '600'))  # seconds finished jobs stay pollable
+LONG_POLL_MAX_WAIT = float(os.environ.get('LONG_POLL_MAX_WAIT', '60'))
+
+# Synchronized reveal: the next question is pushed masked ahead of time
+SYNC_REVEAL_PREFETCH_DELAY = float(os.environ.get('SYNC_REVEAL_PREFETCH_DELAY', '1.0'))  # seconds after a reveal
+REVEAL_METRICS_HISTORY = int(os.environ.get('REVEAL_METRICS_HISTORY', '50'))  # questions kept in /api/metrics
+
+prefetched_questions = {}  # {question index: (key, masked question_prefetch message)}
+prefetch_task = None  # delayed push of the next question, cancelled when the quiz moves on
+
+# Session lifecycle: finished sessions are archived to MongoDB and evicted after a TTL
+SESSION_TTL = float(os.environ.get('SESSION_TTL', '600'))  # seconds a finished session stays in memory
+PLAYER_IDLE_TTL = float(os.environ.get('PLAYER_IDLE_TTL', '7200'))  # seconds without activity before a player is dropped
+SWEEP_INTERVAL = float(os.environ.get('SWEEP_INTERVAL', '30'))
+SWEEP_BATCH = 1000  # players checked between yields to the event loop
+
+player_last_seen = {}  # {session_id: time.monotonic() of the last join or answer}
+
+# Team mode: aggregates are updated as players join, leave and score
+team_stats = {}  # {team name: {"total": summed score, "members": player count}}
+TEAM_NAME_MAX_LENGTH = 50
+TEAM_BROADCAST_INTERVAL = float(os.environ.get('TEAM_BROADCAST_INTERVAL', '1.0'))
+
+JOB_TYPE_LIMITS = {
+    "parse_excel": int(os.environ.get('JOB_LIMIT_PARSE_EXCEL', '2')),
+    "template_excel": int(os.environ.get('JOB_LIMIT_TEMPLATE_EXCEL', '2')),
+    "qr_code": int(os.environ.get('JOB_LIMIT_QR_CODE', '2')),
+}
+
 # Define Models
 class QuizQuestion(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -68,6 +268,7 @@ class Player(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     score: int = 0
+    team: Optional[str] = None
     joined_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class QuizSession(BaseModel):
@@ -83,6 +284,26 @@ class PlayerAnswer(BaseModel):
     answer: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class TournamentCreate(BaseModel):
+    name: str
+
+class TournamentAttach(BaseModel):
+    hub_url: Optional[str] = None  # base URL of the process hosting the tournament, None if local
+
+class RoomScore(BaseModel):
+    name: str
+    score: int
+
+class RoomScoresReport(BaseModel):
+    scores: Dict[str, RoomScore]  # {player_id: latest absolute score}
+
+class LogLevelUpdate(BaseModel):
+    level: str
+    logger: Optional[str] = None  # root logger when omitted
+
+class LogSamplingUpdate(BaseModel):
+    rates: Dict[str, float]  # {event: fraction kept}, 1 disables sampling for that event
+
 # Helper function to get local IP
 def get_local_ip():
     try:
@@ -141,8 +362,12 @@ def parse_excel_file(file_content: bytes):
     ws = wb.active
     
     questions = []
+    total_rows = ws.max_row - 1
+    bad_rows = []
     
     for row in range(2, ws.max_row + 1):
+        if row % 100 == 0:
+            report_job_progress(row - 1, total_rows)
         try:
             question_id = ws.cell(row=row, column=1).value
             question_text = ws.cell(row=row, column=2).value
@@ -176,52 +401,1224 @@ def parse_excel_file(file_content: bytes):
                 points=int(points)
             ))
         except Exception as e:
-            logging.error(f"Error parsing row {row}: {e}")
+            bad_rows.append((row, e))
             continue
     
+    if bad_rows:
+        # One summary instead of a log call per bad row
+        first_row, first_error = bad_rows[0]
+        logger.warning(f"Skipped {len(bad_rows)} unparseable rows, first at row {first_row}: {first_error}",
+                       extra={"event": "parse_excel"})
     return questions
 
+# Event journal: every state-changing event is appended to a local log so a
+# crashed server can recover and a recorded session can be replayed offline
+JOURNAL_DIR = Path(os.environ.get('JOURNAL_DIR', ROOT_DIR / 'journal'))
+JOURNAL_ENABLED = os.environ.get('JOURNAL_ENABLED', 'true').lower() == 'true'
+JOURNAL_SNAPSHOT_EVERY = int(os.environ.get('JOURNAL_SNAPSHOT_EVERY', '1000'))
+JOURNAL_FLUSH_INTERVAL = float(os.environ.get('JOURNAL_FLUSH_INTERVAL', '0.05'))  # seconds entries may wait in memory
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class QuizJournal:
+    """Append-only event log split into segments, one per snapshot.
+
+    Each snapshot of ``quiz_state`` and ``players`` starts a new segment, so
+    recovery loads the latest snapshot and replays only the segments after it.
+    Entries are buffered as dicts and handed to a writer thread every
+    JOURNAL_FLUSH_INTERVAL; the thread encodes, writes, flushes and snapshots,
+    so the event loop never waits on disk or JSON encoding. Values passed to
+    ``record`` must therefore not be mutated afterwards.
+    """
+
+    def __init__(self, directory: Path, snapshot_every: int):
+        self.directory = Path(directory)
+        self.snapshot_every = snapshot_every
+        self.seq = 0
+        self._since_snapshot = 0
+        self._queue = None
+        self._writer = None
+        self._pending = []
+        self._flush_scheduled = False
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.directory / "snapshot.json"
+
+    def segments(self) -> List[Path]:
+        return sorted(self.directory.glob("journal-*.log"))
+
+    def open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._queue = queue.Queue()
+        first_file = self._open_segment(self.seq + 1)
+        self._writer = threading.Thread(target=self._write_loop, args=(first_file,), name="quiz-journal", daemon=True)
+        self._writer.start()
+
+    def close(self):
+        """Stop the writer once everything queued so far is on disk."""
+        if self._writer is not None:
+            self._hand_over()
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _open_segment(self, first_seq: int):
+        return open(self.directory / f"journal-{first_seq:012d}.log", "a", encoding="utf-8")
+
+    def record(self, event_type: str, **data):
+        if self._writer is None:
+            return
+        self.seq += 1
+        self._pending.append({"s": self.seq, "t": event_type, "ts": time.time(), **data})
+        self._since_snapshot += 1
+        # Copying state costs O(players), so big rooms snapshot proportionally less often
+        if self._since_snapshot >= max(self.snapshot_every, len(players)):
+            self.snapshot()
+        elif not self._flush_scheduled:
+            try:
+                asyncio.get_running_loop().call_later(JOURNAL_FLUSH_INTERVAL, self._hand_over)
+                self._flush_scheduled = True
+            except RuntimeError:
+                # No event loop (scripts and tools): write through
+                self._hand_over()
+
+    def _hand_over(self):
+        self._flush_scheduled = False
+        if self._pending and self._writer is not None:
+            self._queue.put(self._pending)
+            self._pending = []
+
+    def snapshot(self):
+        """Queue a snapshot of the current state.
+
+        Only a copy is taken here; serializing it is left to the writer thread.
+        Questions are replaced on upload, never mutated, so sharing them is safe.
+        """
+        self._since_snapshot = 0
+        self._hand_over()
+        self._queue.put({
+            "seq": self.seq,
+            "quiz_state": dict(quiz_state),
+            "players": {sid: dict(player) for sid, player in players.items()},
+            "cursors": dict(player_cursors)
+        })
+
+    def _write_snapshot(self, payload: dict):
+        tmp_path = self.snapshot_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"), default=_json_default)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _write_loop(self, segment):
+        encoder = json.JSONEncoder(separators=(",", ":"), default=_json_default)
+        while True:
+            # Drain everything queued since the last wake-up and flush once
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                try:
+                    if item is None:
+                        segment.close()
+                        return
+                    if isinstance(item, list):
+                        segment.write("".join(encoder.encode(entry) + "\n" for entry in item))
+                    else:
+                        segment.flush()
+                        try:
+                            self._write_snapshot(item)
+                        finally:
+                            segment.close()
+                            segment = self._open_segment(item["seq"] + 1)
+                except Exception as e:
+                    logger.error(f"Journal write failed: {e}")
+            segment.flush()
+
+    def read_entries(self, after_seq: int = 0):
+        """Yield journal entries with a sequence number above ``after_seq``."""
+        segments = self.segments()
+        for i, path in enumerate(segments):
+            # A later segment starting at or before the cut-off covers this one
+            if i + 1 < len(segments) and int(segments[i + 1].stem.split("-")[1]) <= after_seq + 1:
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn write at the end of a segment after a crash
+                        logger.warning(f"Skipping corrupt journal line in {path.name}")
+                        continue
+                    if entry["s"] > after_seq:
+                        yield entry
+
+    def load_snapshot(self) -> int:
+        """Restore state from the latest snapshot and return its sequence number."""
+        if not self.snapshot_path.exists():
+            return 0
+        with open(self.snapshot_path, encoding="utf-8") as f:
+            payload = json.load(f)
+        quiz_state.clear()
+        quiz_state.update(payload["quiz_state"])
+        players.clear()
+        players.update(payload["players"])
+        reset_cursors()
+        for sid, index in payload.get("cursors", {}).items():
+            place_cursor(sid, index)
+        rebuild_team_stats()
+        return payload["seq"]
+
+    def recover(self) -> int:
+        """Rebuild in-memory state from the snapshot plus the journal tail."""
+        if not self.directory.exists():
+            return 0
+        self.seq = self.load_snapshot()
+        replayed = replay_journal(self.read_entries(self.seq))
+        self.seq += replayed
+        return replayed
+
+journal = QuizJournal(JOURNAL_DIR, JOURNAL_SNAPSHOT_EVERY)
+
+class StateVersion:
+    """Monotonic counter bumped on every quiz state mutation.
+
+    The ETag includes a per-boot id so a restarted server never answers 304
+    to a client holding a version from the previous process.
+    """
+
+    def __init__(self):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.value = 0
+        self._changed = None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.boot_id}-{self.value}"'
+
+    def bump(self):
+        self.value += 1
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    async def wait_for_change(self, version: int, timeout: float) -> bool:
+        """Wait until the version moves past ``version``; False on timeout."""
+        if self.value != version:
+            return True
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+state_version = StateVersion()
+
+def record_event(event_type: str, **data):
+    """Journal a state change and bump the version pollers are waiting on."""
+    journal.record(event_type, **data)
+    state_version.bump()
+
+# State transitions shared by the live handlers and journal replay. They must
+# only depend on their arguments and the current state so replay is exact.
+def apply_upload(quiz_id: str, questions: List[dict]):
+    quiz_state["questions"] = questions
+    quiz_state["quiz_id"] = quiz_id
+    if quiz_state["status"] == "finished":
+        # A new bank starts a new session; the finished one must not be archived or evicted with it
+        quiz_state["status"] = "waiting"
+        quiz_state["current_question"] = 0
+    quiz_state["finished_at"] = None
+    quiz_state["archived"] = False
+    reset_cursors()
+
+def is_self_paced() -> bool:
+    return quiz_state.get("mode") == "self_paced"
+
+def reset_cursors():
+    player_cursors.clear()
+    question_progress[:] = [0] * (len(quiz_state["questions"]) + 1)
+
+def place_cursor(sid: str, index: int):
+    player_cursors[sid] = index
+    question_progress[index] += 1
+
+def all_players_done() -> bool:
+    return bool(player_cursors) and question_progress[-1] == len(player_cursors)
+
+def remove_cursor(sid: str):
+    index = player_cursors.pop(sid, None)
+    if index is not None:
+        question_progress[index] -= 1
+        if quiz_state["status"] == "active" and all_players_done():
+            quiz_state["status"] = "finished"
+
+def advance_cursor(sid: str) -> int:
+    """Move a self-paced player to their next question and return its index.
+
+    The quiz finishes once every player has gone past the last question.
+    """
+    index = player_cursors[sid]
+    question_progress[index] -= 1
+    index += 1
+    player_cursors[sid] = index
+    question_progress[index] += 1
+    if question_progress[-1] == len(player_cursors):
+        quiz_state["status"] = "finished"
+    return index
+
+def add_to_team(player: dict, sign: int = 1):
+    team = player.get("team")
+    if team is None:
+        return
+    stats = team_stats.setdefault(team, {"total": 0, "members": 0})
+    stats["total"] += sign * player["score"]
+    stats["members"] += sign
+    if stats["members"] == 0:
+        del team_stats[team]
+
+def rebuild_team_stats():
+    team_stats.clear()
+    for player in players.values():
+        add_to_team(player)
+
+def get_team_standings():
+    standings = []
+    ranked = sorted(team_stats.items(), key=lambda item: item[1]["total"], reverse=True)
+    for position, (team, stats) in enumerate(ranked):
+        # Ties share the rank of the first team with that total, as in tournaments
+        if standings and standings[-1]["total"] == stats["total"]:
+            rank = standings[-1]["rank"]
+        else:
+            rank = position + 1
+        standings.append({
+            "rank": rank,
+            "team": team,
+            "total": stats["total"],
+            "members": stats["members"],
+            "average": round(stats["total"] / stats["members"], 2)
+        })
+    return standings
+
+def apply_join(sid: str, player: dict):
+    if sid in players:
+        add_to_team(players[sid], -1)
+    players[sid] = player
+    add_to_team(player)
+    if is_self_paced() and quiz_state["status"] in ("active", "paused") and sid not in player_cursors:
+        place_cursor(sid, 0)
+
+def apply_leave(sid: str) -> bool:
+    remove_cursor(sid)
+    player = players.pop(sid, None)
+    if player is None:
+        return False
+    add_to_team(player, -1)
+    return True
+
+def apply_answer(sid: str, answer: str, question_number: Optional[int] = None):
+    """Score an answer against the player's current question.
+
+    ``question_number`` is the 1-based question the client answered; an answer
+    for any other question (one that crossed a deadline or the host's next
+    question in flight) is ignored rather than scored against the wrong one.
+    Returns ``(question, is_correct)`` or ``None`` when the answer is ignored.
+    """
+    if sid not in players or quiz_state["status"] != "active":
+        return None
+    if is_self_paced():
+        current_q_idx = player_cursors.get(sid, len(quiz_state["questions"]))
+    else:
+        current_q_idx = quiz_state["current_question"]
+    if current_q_idx >= len(quiz_state["questions"]):
+        return None
+    if question_number is not None and question_number != current_q_idx + 1:
+        return None
+
+    question = quiz_state["questions"][current_q_idx]
+    is_correct = answer == question["correct_answer"]
+    if is_correct:
+        players[sid]["score"] += question["points"]
+        team = players[sid].get("team")
+        if team is not None:
+            team_stats[team]["total"] += question["points"]
+    if is_self_paced():
+        advance_cursor(sid)
+    return question, is_correct
+
+def apply_timeout(sid: str, index: int) -> bool:
+    """Skip a self-paced player past a question whose deadline expired."""
+    if quiz_state["status"] != "active" or player_cursors.get(sid) != index:
+        return False
+    advance_cursor(sid)
+    return True
+
+def apply_start(start_time, mode: str = "host"):
+    quiz_state["status"] = "active"
+    quiz_state["mode"] = mode
+    quiz_state["current_question"] = 0
+    quiz_state["start_time"] = start_time
+    quiz_state["finished_at"] = None
+    quiz_state["archived"] = False
+    reset_cursors()
+    if mode == "self_paced":
+        for sid in players:
+            place_cursor(sid, 0)
+
+def apply_next() -> bool:
+    """Advance to the next question; returns True when the quiz is finished."""
+    quiz_state["current_question"] += 1
+    if quiz_state["current_question"] >= len(quiz_state["questions"]):
+        quiz_state["status"] = "finished"
+        return True
+    return False
+
+def apply_evict():
+    """Drop a finished session's question bank and per-player progress."""
+    quiz_state.update({
+        "status": "waiting",
+        "current_question": 0,
+        "questions": [],
+        "quiz_id": None,
+        "start_time": None,
+        "question_start_time": None,
+        "finished_at": None,
+        "archived": False
+    })
+    reset_cursors()
+
+def apply_pause():
+    quiz_state["status"] = "paused"
+
+def apply_resume():
+    # The last unfinished self-paced player may have left during the pause
+    quiz_state["status"] = "finished" if is_self_paced() and all_players_done() else "active"
+
+JOURNAL_APPLIERS = {
+    "upload": lambda e: apply_upload(e["quiz_id"], e["questions"]),
+    "join": lambda e: apply_join(e["sid"], e["player"]),
+    "leave": lambda e: apply_leave(e["sid"]),
+    "leave_batch": lambda e: [apply_leave(sid) for sid in e["sids"]],
+    "answer": lambda e: apply_answer(e["sid"], e["answer"], e.get("question_number")),
+    "timeout": lambda e: apply_timeout(e["sid"], e["index"]),
+    "start": lambda e: apply_start(e["start_time"], e.get("mode", "host")),
+    "next": lambda e: apply_next(),
+    "evict": lambda e: apply_evict(),
+    "pause": lambda e: apply_pause(),
+    "resume": lambda e: apply_resume(),
+}
+
+def replay_journal(entries) -> int:
+    """Feed journal entries through the state transitions, returning the count."""
+    count = 0
+    for entry in entries:
+        JOURNAL_APPLIERS[entry["t"]](entry)
+        count += 1
+    return count
+
+class DeadlineScheduler:
+    """Serves every self-paced deadline from one heap and one task.
+
+    Entries are never removed early: when a player answers, the stale entry is
+    simply ignored on expiry because their cursor has moved on.
+    """
+
+    def __init__(self, on_expire):
+        self._on_expire = on_expire
+        self._heap = []  # (deadline, sid, question index)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, sid: str, index: int, delay: float):
+        deadline = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self._heap, (deadline, sid, index))
+        if self._heap[0][0] == deadline:
+            self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def clear(self):
+        self._heap.clear()
+        self._wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._heap:
+            delay = self._heap[0][0] - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, sid, index = heapq.heappop(self._heap)
+            try:
+                await self._on_expire(sid, index)
+            except Exception as e:
+                logger.error(f"Deadline handler failed for {sid}: {e}")
+
+class ThrottledBroadcast:
+    """Coalesces frequent state changes into at most one emit per interval."""
+
+    def __init__(self, event: str, build_payload, interval: float):
+        self.event = event
+        self.build_payload = build_payload
+        self.interval = interval
+        self._dirty = False
+        self._task = None
+
+    def touch(self):
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._dirty:
+            self._dirty = False
+            await sio.emit(self.event, self.build_payload())
+            await asyncio.sleep(self.interval)
+
+def get_progress_stats(top: int = 10):
+    total = len(quiz_state["questions"])
+    return {
+        "mode": quiz_state.get("mode", "host"),
+        "status": quiz_state["status"],
+        "total_questions": total,
+        "players": len(players),
+        "at_question": question_progress[:total],
+        "finished": question_progress[total] if len(question_progress) > total else 0,
+        "leaderboard": heapq.nlargest(top, players.values(), key=lambda x: x["score"]),
+        "teams": get_team_standings()
+    }
+
+async def expire_deadline(sid: str, index: int):
+    if not apply_timeout(sid, index):
+        return
+    record_event("timeout", sid=sid, index=index)
+    await sio.emit("question_timeout", {"question_number": index + 1}, room=sid)
+    await send_player_question(sid)
+    progress_broadcast.touch()
+    if quiz_state["status"] == "finished":
+        await announce_self_paced_finish()
+
+deadline_scheduler = DeadlineScheduler(expire_deadline)
+progress_broadcast = ThrottledBroadcast("progress_update", get_progress_stats, PROGRESS_BROADCAST_INTERVAL)
+team_broadcast = ThrottledBroadcast("team_standings", lambda: {"teams": get_team_standings()}, TEAM_BROADCAST_INTERVAL)
+
+class RankIndex:
+    """Keeps scores in sorted order so rank and top-K never need a full sort."""
+
+    def __init__(self):
+        self._order = []  # sorted (-score, key)
+        self._scores = {}  # {key: score}
+
+    def __len__(self):
+        return len(self._scores)
+
+    def update(self, key: str, score: int):
+        old = self._scores.get(key)
+        if old == score:
+            return
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, key))]
+        insort(self._order, (-score, key))
+        self._scores[key] = score
+
+    def rank(self, key: str) -> Optional[int]:
+        """1-based competition rank: tied scores share the best position."""
+        score = self._scores.get(key)
+        if score is None:
+            return None
+        return bisect_left(self._order, (-score,)) + 1
+
+    def top(self, limit: int):
+        return [(key, -neg_score) for neg_score, key in self._order[:limit]]
+
+class Tournament:
+    """Global standings merged incrementally from per-room score reports.
+
+    Rooms report absolute scores, so a retried or duplicated report is harmless
+    and rooms may live in any process.
+    """
+
+    def __init__(self, tournament_id: str, name: str):
+        self.id = tournament_id
+        self.name = name
+        self.created_at = datetime.now(timezone.utc)
+        self.entries = {}  # {"room_id:player_id": {"room_id", "player_id", "name", "score"}}
+        self.rooms = set()
+        self.index = RankIndex()
+
+    @staticmethod
+    def key(room_id: str, player_id: str) -> str:
+        return f"{room_id}:{player_id}"
+
+    def merge(self, room_id: str, scores: Dict[str, dict]):
+        self.rooms.add(room_id)
+        for player_id, update in scores.items():
+            key = self.key(room_id, player_id)
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {"room_id": room_id, "player_id": player_id}
+            entry["name"] = update["name"]
+            entry["score"] = update["score"]
+            self.index.update(key, update["score"])
+
+    def standing(self, key: str, rank: int):
+        return {"rank": rank, **self.entries[key]}
+
+    def top(self, limit: int = 10):
+        standings = []
+        for position, (key, score) in enumerate(self.index.top(limit)):
+            # Ties share the rank of the first player with that score
+            if standings and standings[-1]["score"] == score:
+                rank = standings[-1]["rank"]
+            else:
+                rank = position + 1
+            standings.append(self.standing(key, rank))
+        return standings
+
+    def rank_of(self, room_id: str, player_id: str):
+        key = self.key(room_id, player_id)
+        rank = self.index.rank(key)
+        if rank is None:
+            return None
+        return self.standing(key, rank)
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "created_at": self.created_at,
+            "rooms": sorted(self.rooms),
+            "players": len(self.index)
+        }
+
+class TournamentReporter:
+    """Forwards this room's score changes to its tournament.
+
+    Local tournaments are merged immediately; remote hubs receive the changed
+    scores in one batch per TOURNAMENT_FLUSH_INTERVAL.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending = {}  # {player_id: {"name", "score"}}
+        self._task = None
+        self._http = None
+
+    def mark(self, sid: str):
+        tournament_id = tournament_link["tournament_id"]
+        if tournament_id is None or sid not in players:
+            return
+        player = players[sid]
+        update = {"name": player["name"], "score": player["score"]}
+        if tournament_link["hub_url"] is None:
+            if tournament_id in tournaments:
+                tournaments[tournament_id].merge(ROOM_ID, {player["id"]: update})
+            return
+        self._pending[player["id"]] = update
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def mark_all(self):
+        for sid in players:
+            self.mark(sid)
+
+    async def _run(self):
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            try:
+                await self._post(batch)
+            except Exception as e:
+                logger.error(f"Failed to report scores to tournament hub: {e}")
+                # Keep newer scores that arrived while the request was in flight
+                self._pending = {**batch, **self._pending}
+            await asyncio.sleep(self.interval)
+
+    async def _post(self, batch: Dict[str, dict]):
+        if self._http is None:
+            self._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        url = f"{tournament_link['hub_url'].rstrip('/')}/api/tournaments/{tournament_link['tournament_id']}/rooms/{ROOM_ID}/scores"
+        async with self._http.post(url, json={"scores": batch}) as response:
+            response.raise_for_status()
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+tournament_reporter = TournamentReporter(TOURNAMENT_FLUSH_INTERVAL)
+
+def get_tournament(tournament_id: str) -> Tournament:
+    tournament = tournaments.get(tournament_id)
+    if tournament is None:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    return tournament
+
+# Helper function to render the join QR code as a base64 PNG
+def render_qr_code(url: str) -> str:
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(url)
+    qr.make(fit=True)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    img_buffer = BytesIO()
+    img.save(img_buffer, format='PNG')
+    
+    return base64.b64encode(img_buffer.getvalue()).decode()
+
+class JobCancelled(Exception):
+    pass
+
+current_job = contextvars.ContextVar("current_job", default=None)
+
+def report_job_progress(done: int, total: int):
+    """Report progress from inside a job; a no-op when not running as a job.
+
+    Also the cancellation point: raises JobCancelled once the job is cancelled.
+    """
+    job = current_job.get()
+    if job is not None:
+        job.report(done, total)
+
+class Job:
+    def __init__(self, job_type: str, sid: Optional[str]):
+        self.id = str(uuid.uuid4())
+        self.type = job_type
+        self.sid = sid
+        self.status = "queued"  # queued, running, completed, failed, cancelled
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.exception = None
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at = None
+        self.task = None
+        self._cancelled = threading.Event()
+        self._loop = asyncio.get_running_loop()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def report(self, done: int, total: int):
+        # Runs on a worker thread
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        progress = round(done / total, 2) if total else 1.0
+        if progress != self.progress:
+            self.progress = progress
+            self._loop.call_soon_threadsafe(self.notify, "job_progress")
+
+    def notify(self, event: str):
+        if self.sid is not None:
+            asyncio.ensure_future(sio.emit(event, self.summary(), room=self.sid))
+
+    def summary(self):
+        summary = {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+        if self.status == "completed" and isinstance(self.result, dict):
+            summary["result"] = self.result
+        return summary
+
+class JobManager:
+    """Runs heavy work on a bounded thread pool with per-type concurrency limits.
+
+    Progress and completion are pushed over Socket.IO to the requesting sid.
+    """
+
+    def __init__(self, workers: int, limits: Dict[str, int]):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quiz-job")
+        self._limits = limits
+        self._semaphores = {}
+        self.jobs = {}
+
+    def submit(self, job_type: str, func, *args, sid: Optional[str] = None, then=None) -> Job:
+        """Queue ``func(*args)`` on the pool.
+
+        ``then`` is an optional coroutine function run on the event loop with
+        the worker's return value; its return value becomes the job result.
+        """
+        self.prune()
+        job = Job(job_type, sid)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, func, args, then))
+        return job
+
+    def get(self, job_id: str) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    async def result(self, job: Job):
+        """Wait for a job and return its result, raising HTTP errors on failure."""
+        await asyncio.shield(job.task)
+        if job.status == "cancelled":
+            raise HTTPException(status_code=409, detail="Job was cancelled")
+        if job.status == "failed":
+            if isinstance(job.exception, HTTPException):
+                raise job.exception
+            raise HTTPException(status_code=500, detail=job.error)
+        # The caller owns the result now; the job only stays around for polling
+        result, job.result = job.result, None
+        return result
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _semaphore(self, job_type: str) -> asyncio.Semaphore:
+        if job_type not in self._semaphores:
+            self._semaphores[job_type] = asyncio.Semaphore(self._limits.get(job_type, 1))
+        return self._semaphores[job_type]
+
+    def prune(self):
+        cutoff = datetime.now(timezone.utc).timestamp() - JOB_RETENTION
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.done and job.finished_at.timestamp() < cutoff]:
+            del self.jobs[job_id]
+
+    @staticmethod
+    def _execute(job: Job, func, args):
+        current_job.set(job)
+        return func(*args)
+
+    async def _run(self, job: Job, func, args, then):
+        try:
+            async with self._semaphore(job.type):
+                if job._cancelled.is_set():
+                    raise JobCancelled()
+                job.status = "running"
+                job.notify("job_progress")
+                loop = asyncio.get_running_loop()
+                context = contextvars.copy_context()
+                result = await loop.run_in_executor(self._executor, context.run, self._execute, job, func, args)
+            if job._cancelled.is_set():
+                raise JobCancelled()
+            job.result = await then(result) if then else result
+            job.progress = 1.0
+            job.status = "completed"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.exception = e
+            job.error = e.detail if isinstance(e, HTTPException) else str(e)
+            if not isinstance(e, HTTPException):
+                logger.error(f"Job {job.id} ({job.type}) failed: {e}")
+        job.finished_at = datetime.now(timezone.utc)
+        job.notify("job_completed")
+
+job_manager = JobManager(JOB_WORKERS, JOB_TYPE_LIMITS)
+
+def question_keystream(key: bytes, length: int) -> bytes:
+    """SHA-256 in counter mode: block i is SHA-256(key || i as 4 big-endian bytes).
+
+    Player pages are usually served over plain http on the LAN, where browsers
+    withhold WebCrypto, so the player page carries its own SHA-256 to undo this.
+    Unlike a linear generator, the output reveals nothing about the key, so a
+    known prefix of the payload does not help decode the rest before the reveal.
+    """
+    blocks = (length + 31) // 32
+    return b"".join(hashlib.sha256(key + i.to_bytes(4, "big")).digest() for i in range(blocks))[:length]
+
+def mask_question(index: int):
+    """Mask a question payload with a fresh random key, returning (key, message)."""
+    key = os.urandom(16)
+    plaintext = json.dumps(question_payload(index), default=_json_default).encode()
+    masked = int.from_bytes(plaintext, "little") ^ int.from_bytes(question_keystream(key, len(plaintext)), "little")
+    return key, {
+        "n": index + 1,
+        "d": base64.b64encode(masked.to_bytes(len(plaintext), "little")).decode()
+    }
+
+async def prefetch_question(index: int, delay: float = 0):
+    if delay:
+        await asyncio.sleep(delay)
+    if index >= len(quiz_state["questions"]) or index in prefetched_questions or index < quiz_state["current_question"]:
+        return
+    key, message = mask_question(index)
+    prefetched_questions[index] = (key, message)
+    await sio.emit("question_prefetch", message)
+
+def clear_prefetched():
+    global prefetch_task
+    if prefetch_task is not None:
+        prefetch_task.cancel()
+        prefetch_task = None
+    prefetched_questions.clear()
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class RevealMetrics:
+    """Measures how spread out clients are in showing a revealed question.
+
+    Each client acks a question once it is on screen; the delay is measured on
+    the server from the reveal broadcast, so it includes the ack's trip back.
+    Only a socket's first ack of the current question counts.
+    """
+
+    def __init__(self, history: int):
+        self.history = deque(maxlen=history)
+        self._current = None
+
+    def start(self, question_number: int, mode: str):
+        self.reset()
+        self._current = {
+            "question_number": question_number,
+            "mode": mode,
+            "sent_at": time.perf_counter(),
+            "delays": [],
+            "acked": set()
+        }
+        self.history.append(self._current)
+
+    def reset(self):
+        # Acked sids are only needed while the question is current
+        if self._current is not None:
+            del self._current["acked"]
+        self._current = None
+
+    def ack(self, sid: str, question_number: int):
+        current = self._current
+        if current is None or current["question_number"] != question_number or sid in current["acked"]:
+            return
+        current["acked"].add(sid)
+        current["delays"].append(time.perf_counter() - current["sent_at"])
+
+    def summary(self):
+        questions = []
+        for entry in self.history:
+            delays = sorted(entry["delays"])
+            stats = {"question_number": entry["question_number"], "mode": entry["mode"], "acks": len(delays)}
+            if delays:
+                stats.update({
+                    "first_ms": round(delays[0] * 1000, 1),
+                    "p50_ms": round(percentile(delays, 0.5) * 1000, 1),
+                    "p95_ms": round(percentile(delays, 0.95) * 1000, 1),
+                    "last_ms": round(delays[-1] * 1000, 1),
+                    "skew_ms": round((delays[-1] - delays[0]) * 1000, 1),
+                    "p95_skew_ms": round((percentile(delays, 0.95) - delays[0]) * 1000, 1)
+                })
+            questions.append(stats)
+        return {"questions": questions}
+
+reveal_metrics = RevealMetrics(REVEAL_METRICS_HISTORY)
+
+def deep_sizeof(obj, seen=None) -> int:
+    """Approximate bytes held by a structure of dicts, lists and scalars."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, deque)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+def process_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+class SessionLifecycle:
+    """Archives finished sessions, evicts them after SESSION_TTL and sweeps players.
+
+    The periodic sweep walks players in batches, dropping entries whose socket
+    is gone (a missed disconnect) and disconnecting players idle for longer
+    than PLAYER_IDLE_TTL.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task = None
+        self._archiving = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def on_finished(self):
+        quiz_state["finished_at"] = time.time()
+        self._start_archive()
+
+    def _start_archive(self) -> asyncio.Task:
+        """Start inserting the finished session, or return the insert already running for it.
+
+        The session is identified by its quiz id and finish time, and its record
+        is built right away: by the time the insert completes, an upload or a
+        restart may already have replaced ``quiz_state``.
+        """
+        session_key = (quiz_state["quiz_id"], quiz_state["finished_at"])
+        if self._archiving is not None and self._archiving[0] == session_key and not self._archiving[1].done():
+            return self._archiving[1]
+        session = {
+            "id": quiz_state["quiz_id"],
+            "mode": quiz_state.get("mode", "host"),
+            "questions": quiz_state["questions"],
+            "final_scores": sorted(players.values(), key=lambda x: x["score"], reverse=True),
+            "started_at": quiz_state["start_time"],
+            "finished_at": datetime.fromtimestamp(quiz_state["finished_at"], timezone.utc),
+            "archived_at": datetime.now(timezone.utc)
+        }
+        self._archiving = (session_key, asyncio.create_task(self._insert(session_key, session)))
+        return self._archiving[1]
+
+    async def _insert(self, session_key, session: dict) -> bool:
+        try:
+            await db.quiz_sessions.insert_one(session)
+        except Exception as e:
+            logger.error(f"Failed to archive quiz session {session['id']}: {e}")
+            return False
+        # Only flag the session that was archived, not one that replaced it meanwhile
+        if (quiz_state["quiz_id"], quiz_state["finished_at"]) == session_key:
+            quiz_state["archived"] = True
+        return True
+
+    async def archive(self) -> bool:
+        if quiz_state["archived"] or quiz_state["status"] != "finished":
+            return quiz_state["archived"]
+        # Shielded so a cancelled sweep does not abort an insert it merely waits on
+        return await asyncio.shield(self._start_archive())
+
+    async def evict(self):
+        if not quiz_state["archived"]:
+            logger.warning(f"Evicting quiz session {quiz_state['quiz_id']} before it was archived")
+        apply_evict()
+        record_event("evict")
+        clear_prefetched()
+        await sio.emit("session_evicted", {})
+
+    async def sweep(self):
+        job_manager.prune()
+        if quiz_state["status"] == "finished" and quiz_state["finished_at"] is None:
+            # Finished before a restart: the TTL starts from recovery
+            quiz_state["finished_at"] = time.time()
+        if quiz_state["status"] == "finished":
+            if not quiz_state["archived"]:
+                await self.archive()
+            # The insert yields, so an upload or start may have begun a new session by now
+            if quiz_state["status"] == "finished" and quiz_state["finished_at"] is not None \
+                    and time.time() - quiz_state["finished_at"] > SESSION_TTL:
+                await self.evict()
+        await self.sweep_players()
+
+    async def sweep_players(self) -> int:
+        removed = 0
+        now = time.monotonic()
+        sids = list(players)
+        for start in range(0, len(sids), SWEEP_BATCH):
+            stale, idle = [], []
+            for sid in sids[start:start + SWEEP_BATCH]:
+                if sid not in players:
+                    continue
+                if not sio.manager.is_connected(sid, "/"):
+                    stale.append(sid)
+                elif now - player_last_seen.get(sid, now) > PLAYER_IDLE_TTL:
+                    idle.append(sid)
+            # One journal entry and one player_left broadcast per batch; the
+            # disconnect handlers of idle sockets then find nothing left to remove
+            await remove_players(stale + idle)
+            for sid in idle:
+                await sio.disconnect(sid)
+            removed += len(stale) + len(idle)
+            await asyncio.sleep(0)
+        return removed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}")
+
+    def memory(self):
+        sizes = {
+            "questions": deep_sizeof(quiz_state["questions"]),
+            "players": deep_sizeof(players),
+            "cursors": deep_sizeof(player_cursors) + deep_sizeof(question_progress),
+            "prefetched_questions": deep_sizeof(prefetched_questions),
+            "activity": deep_sizeof(player_last_seen),
+            "teams": deep_sizeof(team_stats)
+        }
+        return {
+            "quiz_id": quiz_state["quiz_id"],
+            "status": quiz_state["status"],
+            "players": len(players),
+            "bytes": {**sizes, "total": sum(sizes.values())},
+            "jobs_retained": len(job_manager.jobs),
+            "process_rss_bytes": process_rss(),
+            "limits": {
+                "session_ttl": SESSION_TTL,
+                "sweep_interval": self.interval,
+                "job_retention": JOB_RETENTION,
+                "player_idle_ttl": PLAYER_IDLE_TTL
+            }
+        }
+
+session_lifecycle = SessionLifecycle(SWEEP_INTERVAL)
+
+async def remove_players(sids: List[str]):
+    was_active = quiz_state["status"] == "active"
+    removed = []
+    teams_changed = False
+    for sid in sids:
+        player_last_seen.pop(sid, None)
+        team = players[sid].get("team") if sid in players else None
+        if apply_leave(sid):
+            removed.append(sid)
+            teams_changed = teams_changed or team is not None
+    if not removed:
+        return
+    if len(removed) == 1:
+        record_event("leave", sid=removed[0])
+    else:
+        record_event("leave_batch", sids=removed)
+    await sio.emit("player_left", {"players": list(players.values())})
+    if teams_changed:
+        team_broadcast.touch()
+    if is_self_paced() and was_active and quiz_state["status"] == "finished":
+        await announce_self_paced_finish()
+
 # Socket.IO event handlers
 @sio.event
 async def connect(sid, environ):
-    print(f"Client {sid} connected")
+    log_event("connect", "Client connected", sid=sid)
 
 @sio.event
 async def disconnect(sid):
-    print(f"Client {sid} disconnected")
-    if sid in players:
-        del players[sid]
-        await sio.emit("player_left", {"players": list(players.values())})
+    log_event("disconnect", "Client disconnected", sid=sid)
+    await remove_players([sid])
 
 @sio.event
 async def join_player(sid, data):
-    player = Player(id=sid, name=data["name"])
-    players[sid] = player.dict()
+    sid_var.set(sid)
+    team = str(data.get("team") or "").strip()[:TEAM_NAME_MAX_LENGTH] or None
+    player = Player(id=sid, name=data["name"], team=team)
+    apply_join(sid, player.dict())
+    record_event("join", sid=sid, player=dict(players[sid]))
+    player_last_seen[sid] = time.monotonic()
+    tournament_reporter.mark(sid)
+    if team is not None:
+        team_broadcast.touch()
     
     await sio.emit("player_joined", {
         "player": player.dict(),
         "players": list(players.values())
     })
+    
+    if sid in player_cursors and quiz_state["status"] == "active":
+        await sio.emit("quiz_started", {"status": "active"}, room=sid)
+        await send_player_question(sid)
+    
+    # Late joiners still need the upcoming masked question
+    for _, message in prefetched_questions.values():
+        if message["n"] > quiz_state["current_question"] + 1:
+            await sio.emit("question_prefetch", message, room=sid)
 
 @sio.event
 async def submit_answer(sid, data):
-    if sid in players and quiz_state["status"] == "active":
-        player = players[sid]
-        current_q_idx = quiz_state["current_question"]
+    question_number = data.get("question_number")
+    result = apply_answer(sid, data["answer"], question_number)
+    if result is not None:
+        player_last_seen[sid] = time.monotonic()
+        record_event("answer", sid=sid, answer=data["answer"], question_number=question_number)
+        question, is_correct = result
+        log_event("answer", "Answer %s to question %s is %s", data["answer"], question["id"],
+                  "correct" if is_correct else "wrong", sid=sid)
+        if is_correct:
+            tournament_reporter.mark(sid)
+            if players[sid].get("team") is not None:
+                team_broadcast.touch()
         
-        if current_q_idx < len(quiz_state["questions"]):
-            question = quiz_state["questions"][current_q_idx]
-            is_correct = data["answer"] == question["correct_answer"]
-            
-            if is_correct:
-                player["score"] += question["points"]
-                players[sid] = player
-            
-            await sio.emit("answer_feedback", {
-                "correct": is_correct,
-                "correct_answer": question["correct_answer"],
-                "score": player["score"]
-            }, room=sid)
+        await sio.emit("answer_feedback", {
+            "correct": is_correct,
+            "correct_answer": question["correct_answer"],
+            "score": players[sid]["score"]
+        }, room=sid)
+        
+        if is_self_paced():
+            await send_player_question(sid)
+            progress_broadcast.touch()
+            if quiz_state["status"] == "finished":
+                await announce_self_paced_finish()
+
+@sio.event
+async def tournament_top(sid, data):
+    data = data or {}
+    tournament = tournaments.get(data.get("tournament_id"))
+    if tournament is None:
+        return {"error": "Tournament not found"}
+    try:
+        limit = int(data.get("limit", 10))
+    except (TypeError, ValueError):
+        return {"error": "limit must be an integer"}
+    return {"standings": tournament.top(min(max(limit, 1), TOURNAMENT_TOP_MAX))}
+
+@sio.event
+async def tournament_rank(sid, data):
+    data = data or {}
+    tournament = tournaments.get(data.get("tournament_id"))
+    if tournament is None:
+        return {"error": "Tournament not found"}
+    standing = tournament.rank_of(data.get("room_id", ROOM_ID), data.get("player_id", sid))
+    if standing is None:
+        return {"error": "Player not ranked in this tournament"}
+    return {"standing": standing, "players": len(tournament.index)}
+
+@sio.event
+async def question_fetch(sid, data):
+    """Plain payload of an already revealed question for clients that missed the prefetch."""
+    index = int(data.get("n", 0)) - 1
+    if quiz_state["status"] != "active" or not 0 <= index <= quiz_state["current_question"] \
+            or index >= len(quiz_state["questions"]):
+        return {"error": "Question not revealed"}
+    return question_payload(index)
+
+@sio.event
+async def reveal_ack(sid, data):
+    reveal_metrics.ack(sid, data.get("n"))
 
 # API Routes
 @api_router.get("/")
@@ -229,21 +1626,12 @@ async def root():
     return {"message": "Family Quiz API"}
 
 @api_router.get("/qr-code")
-async def get_qr_code():
+async def get_qr_code(sid: Optional[str] = None):
     local_ip = get_local_ip()
     frontend_url = f"http://{local_ip}:3000/join"
     
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(frontend_url)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    img_buffer = BytesIO()
-    img.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
-    
     # Convert to base64 for JSON response
-    img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
+    img_base64 = await job_manager.result(job_manager.submit("qr_code", render_qr_code, frontend_url, sid=sid))
     
     return {
         "qr_code": f"data:image/png;base64,{img_base64}",
@@ -252,8 +1640,8 @@ async def get_qr_code():
     }
 
 @api_router.get("/template-excel")
-async def download_template():
-    excel_buffer = generate_template_excel()
+async def download_template(sid: Optional[str] = None):
+    excel_buffer = await job_manager.result(job_manager.submit("template_excel", generate_template_excel, sid=sid))
     
     return StreamingResponse(
         BytesIO(excel_buffer.getvalue()),
@@ -262,40 +1650,73 @@ async def download_template():
     )
 
 @api_router.post("/upload-excel")
-async def upload_excel(file: UploadFile = File(...)):
+async def upload_excel(file: UploadFile = File(...), sid: Optional[str] = None, wait: bool = True):
+    """Parse an uploaded question bank on the job pool.
+
+    With ``wait=false`` the job id is returned at once; poll /api/jobs/{id} or
+    listen for job_progress/job_completed on the host socket ``sid``.
+    """
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="Only Excel files are allowed")
     
     content = await file.read()
-    questions = parse_excel_file(content)
-    
+    job = job_manager.submit("parse_excel", parse_excel_file, content, sid=sid, then=load_questions)
+    if not wait:
+        return {"job_id": job.id, "status": job.status}
+    return await job_manager.result(job)
+
+async def load_questions(questions: List[QuizQuestion]):
     if not questions:
         raise HTTPException(status_code=400, detail="No valid questions found in Excel file")
     
     # Store questions in quiz state
-    quiz_state["questions"] = [q.dict() for q in questions]
-    quiz_state["quiz_id"] = str(uuid.uuid4())
+    apply_upload(str(uuid.uuid4()), [q.dict() for q in questions])
+    record_event("upload", quiz_id=quiz_state["quiz_id"], questions=quiz_state["questions"])
     
-    await sio.emit("questions_loaded", {
-        "count": len(questions),
-        "questions": [q.dict() for q in questions]
-    })
+    # Every player socket gets this, so it must not carry the bank or its answers
+    await sio.emit("questions_loaded", {"count": len(questions)})
     
-    return {"message": f"Successfully loaded {len(questions)} questions", "questions": questions}
+    return {"message": f"Successfully loaded {len(questions)} questions", "questions": quiz_state["questions"]}
+
+@api_router.get("/jobs")
+async def list_jobs():
+    return {"jobs": [job.summary() for job in job_manager.jobs.values()]}
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return job_manager.get(job_id).summary()
+
+@api_router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job.done:
+        raise HTTPException(status_code=400, detail=f"Job already {job.status}")
+    job.cancel()
+    return {"message": "Cancellation requested", "job_id": job.id}
 
 @api_router.post("/start-quiz")
-async def start_quiz():
+async def start_quiz(mode: str = "host", sync_reveal: bool = False):
     if not quiz_state["questions"]:
         raise HTTPException(status_code=400, detail="No questions loaded")
+    if mode not in ("host", "self_paced"):
+        raise HTTPException(status_code=400, detail="Mode must be 'host' or 'self_paced'")
     
-    quiz_state["status"] = "active"
-    quiz_state["current_question"] = 0
-    quiz_state["start_time"] = datetime.now(timezone.utc)
+    deadline_scheduler.clear()
+    clear_prefetched()
+    reveal_metrics.reset()
+    quiz_state["sync_reveal"] = sync_reveal and mode == "host"
+    apply_start(datetime.now(timezone.utc), mode)
+    record_event("start", start_time=quiz_state["start_time"], mode=mode)
     
-    await sio.emit("quiz_started", {"status": "active"})
+    await sio.emit("quiz_started", {"status": "active", "mode": mode})
     
     # Send first question
-    await send_current_question()
+    if is_self_paced():
+        for sid in list(player_cursors):
+            await send_player_question(sid)
+        progress_broadcast.touch()
+    else:
+        await send_current_question()
     
     return {"message": "Quiz started"}
 
@@ -303,13 +1724,15 @@ async def start_quiz():
 async def next_question():
     if quiz_state["status"] != "active":
         raise HTTPException(status_code=400, detail="Quiz is not active")
+    if is_self_paced():
+        raise HTTPException(status_code=400, detail="Players advance on their own in self-paced mode")
     
-    quiz_state["current_question"] += 1
+    finished = apply_next()
+    record_event("next")
     
-    if quiz_state["current_question"] >= len(quiz_state["questions"]):
-        # Quiz finished
-        quiz_state["status"] = "finished"
-        await sio.emit("quiz_finished", {"final_scores": list(players.values())})
+    if finished:
+        session_lifecycle.on_finished()
+        await sio.emit("quiz_finished", {"final_scores": list(players.values()), "team_standings": get_team_standings()})
         return {"message": "Quiz finished"}
     
     await send_current_question()
@@ -317,49 +1740,234 @@ async def next_question():
 
 @api_router.post("/pause-quiz")
 async def pause_quiz():
-    quiz_state["status"] = "paused"
+    apply_pause()
+    record_event("pause")
+    deadline_scheduler.clear()
     await sio.emit("quiz_paused", {})
     return {"message": "Quiz paused"}
 
 @api_router.post("/resume-quiz")
 async def resume_quiz():
-    quiz_state["status"] = "active"
+    apply_resume()
+    record_event("resume")
+    if quiz_state["status"] == "finished":
+        await announce_self_paced_finish()
+        return {"message": "Quiz finished"}
     await sio.emit("quiz_resumed", {})
+    # Self-paced players get their current question again with a fresh deadline
+    if is_self_paced():
+        for sid in list(player_cursors):
+            await send_player_question(sid)
     return {"message": "Quiz resumed"}
 
-@api_router.get("/quiz-state")
-async def get_quiz_state():
+# Serialized bodies of versioned endpoints: {name: (etag, body)}
+versioned_bodies = {}
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+async def versioned_response(request: Request, name: str, build, wait: float = 0):
+    """Serve a state snapshot with ETag support and optional long-polling.
+
+    A request whose If-None-Match matches the current version gets a 304, or
+    with ``wait`` > 0 is held until the state changes or the wait expires.
+    Bodies are serialized once per version and shared by all pollers.
+    """
+    if etag_matches(request, state_version.etag) and wait > 0:
+        await state_version.wait_for_change(state_version.value, min(wait, LONG_POLL_MAX_WAIT))
+    etag = state_version.etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    cached = versioned_bodies.get(name)
+    if cached is None or cached[0] != etag:
+        cached = versioned_bodies[name] = (etag, json.dumps(build(), default=_json_default))
+    return Response(content=cached[1], media_type="application/json", headers=headers)
+
+def build_quiz_state():
     return {
         "status": quiz_state["status"],
+        "mode": quiz_state.get("mode", "host"),
         "current_question": quiz_state["current_question"],
         "total_questions": len(quiz_state["questions"]),
-        "players": list(players.values())
+        "players": list(players.values()),
+        "teams": get_team_standings(),
+        "version": state_version.value
     }
 
-@api_router.get("/scores")
-async def get_scores():
+@api_router.get("/quiz-state")
+async def get_quiz_state(request: Request, wait: float = 0):
+    return await versioned_response(request, "quiz-state", build_quiz_state, wait)
+
+@api_router.get("/metrics")
+async def get_metrics():
+    return {"reveal": reveal_metrics.summary()}
+
+@api_router.get("/admin/logging")
+async def get_logging_config():
+    return {
+        "level": logging.getLevelName(logging.getLogger().level),
+        "sample_rates": sampling_filter.rates,
+        "sampled_out": sampling_filter.dropped,
+        "queue_dropped": log_queue_handler.dropped,
+        "queue_size": log_queue_handler.queue.qsize()
+    }
+
+@api_router.post("/admin/log-level")
+async def set_log_level(body: LogLevelUpdate):
+    level = body.level.upper()
+    if not isinstance(logging.getLevelName(level), int):
+        raise HTTPException(status_code=400, detail=f"Unknown log level {body.level}")
+    logging.getLogger(body.logger).setLevel(level)
+    logger.warning(f"Log level of {body.logger or 'root'} set to {level}", extra={"event": "admin"})
+    return {"logger": body.logger or "root", "level": level}
+
+@api_router.post("/admin/log-sampling")
+async def set_log_sampling(body: LogSamplingUpdate):
+    if any(not 0 <= rate <= 1 for rate in body.rates.values()):
+        raise HTTPException(status_code=400, detail="Sample rates must be between 0 and 1")
+    sampling_filter.rates.update(body.rates)
+    return {"sample_rates": sampling_filter.rates}
+
+@api_router.get("/sessions/memory")
+async def get_session_memory():
+    return session_lifecycle.memory()
+
+@api_router.get("/progress")
+async def get_progress(top: int = 10):
+    return get_progress_stats(top)
+
+def build_scores():
     sorted_players = sorted(players.values(), key=lambda x: x["score"], reverse=True)
-    return {"scores": sorted_players}
+    return {"scores": sorted_players, "teams": get_team_standings(), "version": state_version.value}
+
+@api_router.get("/scores")
+async def get_scores(request: Request, wait: float = 0):
+    return await versioned_response(request, "scores", build_scores, wait)
+
+def question_payload(index: int):
+    question = quiz_state["questions"][index]
+    return {
+        "question": {
+            "id": question["id"],
+            "question": question["question"],
+            "option_a": question["option_a"],
+            "option_b": question["option_b"],
+            "option_c": question["option_c"],
+            "option_d": question["option_d"],
+            "duration": question["duration"],
+            "points": question["points"]
+        },
+        "question_number": index + 1,
+        "total_questions": len(quiz_state["questions"])
+    }
+
+@api_router.post("/tournaments")
+async def create_tournament(body: TournamentCreate):
+    tournament = Tournament(str(uuid.uuid4()), body.name)
+    tournaments[tournament.id] = tournament
+    return tournament.summary()
+
+@api_router.get("/tournaments/{tournament_id}")
+async def get_tournament_summary(tournament_id: str):
+    return get_tournament(tournament_id).summary()
+
+@api_router.post("/tournaments/{tournament_id}/attach")
+async def attach_tournament(tournament_id: str, body: TournamentAttach):
+    if body.hub_url is None:
+        get_tournament(tournament_id)
+    tournament_link["tournament_id"] = tournament_id
+    tournament_link["hub_url"] = body.hub_url
+    tournament_reporter.mark_all()
+    return {"message": f"Room {ROOM_ID} reports to tournament {tournament_id}", "room_id": ROOM_ID}
+
+@api_router.post("/tournaments/{tournament_id}/rooms/{room_id}/scores")
+async def report_room_scores(tournament_id: str, room_id: str, body: RoomScoresReport):
+    tournament = get_tournament(tournament_id)
+    tournament.merge(room_id, {player_id: score.dict() for player_id, score in body.scores.items()})
+    return {"merged": len(body.scores)}
+
+@api_router.get("/tournaments/{tournament_id}/top")
+async def get_tournament_top(tournament_id: str, limit: int = Query(10, ge=1, le=TOURNAMENT_TOP_MAX)):
+    return {"standings": get_tournament(tournament_id).top(limit)}
+
+@api_router.get("/tournaments/{tournament_id}/rank/{player_id}")
+async def get_tournament_rank(tournament_id: str, player_id: str, room_id: Optional[str] = None):
+    tournament = get_tournament(tournament_id)
+    standing = tournament.rank_of(room_id or ROOM_ID, player_id)
+    if standing is None:
+        raise HTTPException(status_code=404, detail="Player not ranked in this tournament")
+    return {"standing": standing, "players": len(tournament.index)}
 
 async def send_current_question():
-    if quiz_state["current_question"] < len(quiz_state["questions"]):
-        question = quiz_state["questions"][quiz_state["current_question"]]
+    index = quiz_state["current_question"]
+    if index < len(quiz_state["questions"]):
+        if quiz_state["sync_reveal"]:
+            await reveal_current_question()
+            return
         quiz_state["question_start_time"] = datetime.now(timezone.utc)
         
-        await sio.emit("question", {
-            "question": {
-                "id": question["id"],
-                "question": question["question"],
-                "option_a": question["option_a"],
-                "option_b": question["option_b"],
-                "option_c": question["option_c"],
-                "option_d": question["option_d"],
-                "duration": question["duration"],
-                "points": question["points"]
-            },
-            "question_number": quiz_state["current_question"] + 1,
-            "total_questions": len(quiz_state["questions"])
-        })
+        reveal_metrics.start(index + 1, "broadcast")
+        await sio.emit("question", question_payload(index))
+
+async def reveal_current_question():
+    """Release a pre-distributed question with a few-byte key broadcast.
+
+    The following question is then pushed masked in the background while
+    this one is on screen, so its reveal is equally cheap.
+    """
+    global prefetch_task
+    if prefetch_task is not None:
+        # The host moved on before the delayed push ran; it would resend this question
+        prefetch_task.cancel()
+    index = quiz_state["current_question"]
+    if index not in prefetched_questions:
+        # Nothing was distributed ahead of time (first question): send it now,
+        # the reveal below is still ordered after it on every socket
+        await prefetch_question(index)
+    key, _ = prefetched_questions.pop(index)
+    for stale in [i for i in prefetched_questions if i < index]:
+        del prefetched_questions[stale]
+    
+    quiz_state["question_start_time"] = datetime.now(timezone.utc)
+    reveal_metrics.start(index + 1, "sync_reveal")
+    await sio.emit("question_reveal", {
+        "n": index + 1,
+        "k": base64.b64encode(key).decode(),
+        "t": int(quiz_state["question_start_time"].timestamp() * 1000)
+    })
+    prefetch_task = asyncio.create_task(prefetch_question(index + 1, SYNC_REVEAL_PREFETCH_DELAY))
+
+async def send_player_question(sid: str):
+    """Send a self-paced player their current question and arm its deadline."""
+    index = player_cursors.get(sid)
+    if index is None:
+        return
+    if index >= len(quiz_state["questions"]):
+        await sio.emit("player_finished", {"score": players[sid]["score"]}, room=sid)
+        return
+    
+    deadline_scheduler.schedule(sid, index, quiz_state["questions"][index]["duration"] + SELF_PACED_GRACE)
+    await sio.emit("question", question_payload(index), room=sid)
+
+async def announce_self_paced_finish():
+    session_lifecycle.on_finished()
+    deadline_scheduler.clear()
+    progress_broadcast.touch()
+    await sio.emit("quiz_finished", {"final_scores": list(players.values()), "team_standings": get_team_standings()})
+
+@app.middleware("http")
+async def bind_request_id(request: Request, call_next):
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -375,16 +1983,32 @@ app.add_middleware(
 # Mount Socket.IO app
 socket_app = socketio.ASGIApp(sio, app)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+@app.on_event("startup")
+async def route_server_logs():
+    # Runners that configure uvicorn's logging after importing the app re-add its handlers
+    adopt_uvicorn_loggers()
+
+@app.on_event("startup")
+async def recover_journal():
+    if not JOURNAL_ENABLED:
+        return
+    replayed = journal.recover()
+    if replayed:
+        logger.info(f"Recovered quiz state by replaying {replayed} journal events")
+    journal.open()
+
+@app.on_event("startup")
+async def start_session_lifecycle():
+    session_lifecycle.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    session_lifecycle.stop()
     client.close()
+    await tournament_reporter.close()
+    job_manager.shutdown()
+    log_listener.stop()
+    journal.close()
 
 # Export the ASGI app
 app = socket_app
\ No newline at end of file
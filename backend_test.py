@@ -6,11 +6,15 @@ Tests FastAPI server, WebSocket connections, Excel processing, QR code generatio
 
 import asyncio
 import json
+import subprocess
+import sys
+import tempfile
 import requests
 import socketio
 import openpyxl
 from io import BytesIO
 import base64
+import threading
 import time
 from pathlib import Path
 import os
@@ -21,6 +25,97 @@ load_dotenv('/app/frontend/.env')
 BACKEND_URL = os.getenv('REACT_APP_BACKEND_URL', 'https://flashquiz-2.preview.emergentagent.com')
 API_BASE = f"{BACKEND_URL}/api"
 
+# Run in a child process that is then killed, so its sockets vanish without a disconnect
+VANISHING_PLAYERS_SCRIPT = """
+import asyncio, sys, socketio
+
+async def main(url, count, name):
+    for i in range(count):
+        client = socketio.AsyncClient(reconnection=False)
+        await client.connect(url, transports=['polling'])
+        await client.emit('join_player', {'name': f'{name}-{i}'})
+    await asyncio.sleep(1)
+    print("joined", flush=True)
+    await asyncio.sleep(3600)
+
+asyncio.run(main(sys.argv[1], int(sys.argv[2]), sys.argv[3]))
+"""
+
+# Records a self-paced session through the server's state transitions into a
+# journal with a small snapshot interval, then rebuilds the state from it twice:
+# snapshot plus tail, and a full replay from empty. Runs in a child process so
+# the server module gets its own JOURNAL_DIR and state.
+JOURNAL_RECOVERY_SCRIPT = """
+import asyncio, copy, json, os, sys
+directory, backend_dir = sys.argv[1], sys.argv[2]
+os.environ.update(MONGO_URL='mongodb://localhost:27017', DB_NAME='quiz_journal_test', JOURNAL_DIR=directory,
+                  JOURNAL_ENABLED='false', LOG_LEVEL='WARNING')
+sys.path.insert(0, backend_dir)
+import server
+
+SNAPSHOT_EVERY = 5
+initial_state = copy.deepcopy(server.quiz_state)
+
+def event(event_type, **data):
+    # Live handlers apply, then journal a copy that later mutations cannot touch
+    server.JOURNAL_APPLIERS[event_type](dict(data))
+    server.record_event(event_type, **copy.deepcopy(data))
+
+def state():
+    return json.loads(json.dumps({
+        "quiz_state": server.quiz_state,
+        "players": server.players,
+        "cursors": server.player_cursors,
+        "progress": server.question_progress,
+        "teams": server.get_team_standings()
+    }, default=server._json_default))
+
+server.journal = journal = server.QuizJournal(directory, SNAPSHOT_EVERY)
+journal.open()
+questions = [{"id": f"J{i}", "question": f"Question {i}?", "option_a": "1", "option_b": "2", "option_c": "3",
+              "option_d": "4", "correct_answer": "B", "duration": 30, "points": 10 * i} for i in range(1, 4)]
+event("upload", quiz_id="journal-quiz", questions=questions)
+for i in range(6):
+    event("join", sid=f"sid-{i}", player=server.Player(id=f"sid-{i}", name=f"Player {i}", team=["Red", "Blue", None][i % 3]).dict())
+event("start", start_time=server.datetime.now(server.timezone.utc), mode="self_paced")
+for i in range(6):
+    event("answer", sid=f"sid-{i}", answer="B" if i % 2 else "A", question_number=1)
+event("answer", sid="sid-1", answer="B", question_number=1)  # stale: ignored live and on replay
+event("timeout", sid="sid-1", index=1)
+event("answer", sid="sid-3", answer="B", question_number=2)
+event("pause")
+event("resume")
+# Departures go through the live path, which journals several at once as one leave_batch
+asyncio.run(server.remove_players(["sid-0", "sid-3"]))
+asyncio.run(server.remove_players(["sid-4"]))
+expected = state()
+recorded = journal.seq
+journal.close()
+
+recovered_journal = server.QuizJournal(directory, SNAPSHOT_EVERY)
+snapshot_seq = json.load(open(recovered_journal.snapshot_path))["seq"]
+tail = [entry["t"] for entry in recovered_journal.read_entries(snapshot_seq)]
+replayed = recovered_journal.recover()
+recovered = state()
+
+server.quiz_state.clear()
+server.quiz_state.update(copy.deepcopy(initial_state))
+server.players.clear()
+server.team_stats.clear()
+server.reset_cursors()
+server.replay_journal(recovered_journal.read_entries(0))
+print(json.dumps({
+    "events": recorded,
+    "segments": len(recovered_journal.segments()),
+    "snapshot_seq": snapshot_seq,
+    "tail": tail,
+    "replayed_from_snapshot": replayed,
+    "expected": expected,
+    "recovered": recovered,
+    "replayed": state()
+}, default=str))
+"""
+
 class BackendTester:
     def __init__(self):
         self.session = requests.Session()
@@ -124,7 +219,7 @@ class BackendTester:
             self.log_test("Template Excel Download", False, f"Error: {str(e)}")
             return False
     
-    def create_test_excel(self):
+    def create_test_excel(self, durations=(30, 25)):
         """Create a test Excel file with red cell marking correct answers"""
         wb = openpyxl.Workbook()
         ws = wb.active
@@ -140,8 +235,8 @@ class BackendTester:
         red_fill = PatternFill(start_color="FFFF0000", end_color="FFFF0000", fill_type="solid")
         
         questions = [
-            ["T1", "What is 2+2?", "3", "4", "5", "6", 30, 10],  # Correct: B
-            ["T2", "Capital of France?", "London", "Berlin", "Paris", "Madrid", 25, 15],  # Correct: C
+            ["T1", "What is 2+2?", "3", "4", "5", "6", durations[0], 10],  # Correct: B
+            ["T2", "Capital of France?", "London", "Berlin", "Paris", "Madrid", durations[1], 15],  # Correct: C
         ]
         
         correct_cols = [4, 5]  # B and C columns (0-indexed: 3, 4 -> 1-indexed: 4, 5)
@@ -206,6 +301,95 @@ class BackendTester:
             self.log_test("Excel Upload Processing", False, f"Error: {str(e)}")
             return False
     
+    def create_large_test_excel(self, rows=20000):
+        """Create a question bank big enough that parsing it takes a few seconds"""
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        for row in range(2, rows + 2):
+            for col, value in enumerate([f"L{row}", f"Question {row}?", "1", "2", "3", "4", 30, 10], 1):
+                ws.cell(row=row, column=col, value=value)
+        excel_buffer = BytesIO()
+        wb.save(excel_buffer)
+        return excel_buffer.getvalue()
+    
+    def test_job_apis(self):
+        """Test background upload jobs: polling, cancellation, failures and unknown ids"""
+        try:
+            def submit(name, content):
+                files = {'file': (name, content, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
+                return self.session.post(f"{API_BASE}/upload-excel", params={"wait": "false"}, files=files, timeout=30).json()
+            
+            def job(job_id):
+                return self.session.get(f"{API_BASE}/jobs/{job_id}", timeout=10).json()
+            
+            def finished(job_id):
+                summary = job(job_id)
+                return summary if summary["status"] in ("completed", "failed", "cancelled") else None
+            
+            # A job id comes back at once and the job can be polled to completion
+            submitted = submit('test_quiz.xlsx', self.create_test_excel().getvalue())
+            if "job_id" not in submitted or submitted["status"] not in ("queued", "running"):
+                self.log_test("Job APIs", False, f"Upload without waiting should return a pending job: {submitted}")
+                return False
+            completed = self.wait_for(lambda: finished(submitted["job_id"]), 15, interval=0.2)
+            if not completed or completed["status"] != "completed" or completed["progress"] != 1.0 or not completed["finished_at"]:
+                self.log_test("Job APIs", False, f"Upload job did not complete: {completed}")
+                return False
+            if submitted["job_id"] not in [entry["id"] for entry in self.session.get(f"{API_BASE}/jobs", timeout=10).json()["jobs"]]:
+                self.log_test("Job APIs", False, "Finished job missing from /jobs")
+                return False
+            
+            # More slow uploads than the per-type limit: some run while the rest wait their turn
+            large_bank = self.create_large_test_excel()
+            job_ids = [submit(f'large_{i}.xlsx', large_bank)["job_id"] for i in range(4)]
+            statuses = {job_id: job(job_id)["status"] for job_id in job_ids}
+            running = [job_id for job_id, status in statuses.items() if status == "running"]
+            queued = [job_id for job_id, status in statuses.items() if status == "queued"]
+            if not running or not queued:
+                self.log_test("Job APIs", False, f"Expected running and queued jobs, got {list(statuses.values())}")
+                return False
+            
+            for job_id in job_ids:
+                cancel_response = self.session.post(f"{API_BASE}/jobs/{job_id}/cancel", timeout=10)
+                if cancel_response.status_code != 200:
+                    self.log_test("Job APIs", False, f"Cancel failed: {cancel_response.status_code} {cancel_response.text}")
+                    return False
+            for job_id in running[:1] + queued[:1]:
+                cancelled = self.wait_for(lambda: finished(job_id), 30, interval=0.2)
+                if not cancelled or cancelled["status"] != "cancelled":
+                    self.log_test("Job APIs", False, f"Cancelled {statuses[job_id]} job ended as {cancelled}")
+                    return False
+            self.wait_for(lambda: all(finished(job_id) for job_id in job_ids), 30, interval=0.2)
+            
+            again_response = self.session.post(f"{API_BASE}/jobs/{job_ids[0]}/cancel", timeout=10)
+            if again_response.status_code != 400:
+                self.log_test("Job APIs", False, f"Cancelling a finished job should give 400, got {again_response.status_code}")
+                return False
+            
+            # A file that is not a workbook fails the job with an error instead of completing it
+            broken = submit('broken.xlsx', b"not a workbook")
+            failed = self.wait_for(lambda: finished(broken["job_id"]), 15, interval=0.2)
+            if not failed or failed["status"] != "failed" or not failed["error"]:
+                self.log_test("Job APIs", False, f"Broken upload should fail its job: {failed}")
+                return False
+            waited_response = self.session.post(f"{API_BASE}/upload-excel", files={'file': ('broken.xlsx', b"not a workbook")}, timeout=15)
+            if waited_response.status_code != 500:
+                self.log_test("Job APIs", False, f"Waiting on a failing job should give 500, got {waited_response.status_code}")
+                return False
+            
+            for method, url in [("get", f"{API_BASE}/jobs/does-not-exist"), ("post", f"{API_BASE}/jobs/does-not-exist/cancel")]:
+                unknown_response = getattr(self.session, method)(url, timeout=10)
+                if unknown_response.status_code != 404:
+                    self.log_test("Job APIs", False, f"Unknown job should give 404 on {method.upper()} {url}, got {unknown_response.status_code}")
+                    return False
+            
+            self.log_test("Job APIs", True, "Jobs polled to completion, queued and running jobs cancelled, failures reported, unknown ids 404")
+            return True
+            
+        except Exception as e:
+            self.log_test("Job APIs", False, f"Error: {str(e)}")
+            return False
+    
     def test_socketio_server_configuration(self):
         """Test if Socket.IO server is properly configured in backend"""
         try:
@@ -310,6 +494,342 @@ class BackendTester:
             self.log_test("Quiz Management APIs", False, f"Error: {str(e)}")
             return False
     
+    def test_tournament_apis(self):
+        """Test tournament creation, score merging from several rooms and tie ranks"""
+        try:
+            create_response = self.session.post(f"{API_BASE}/tournaments", json={"name": "Test Cup"}, timeout=10)
+            if create_response.status_code != 200:
+                self.log_test("Tournament APIs", False, f"Create failed: {create_response.status_code}")
+                return False
+            tournament_url = f"{API_BASE}/tournaments/{create_response.json()['id']}"
+            
+            def report(room_id, scores):
+                body = {"scores": {player_id: {"name": name, "score": score} for player_id, (name, score) in scores.items()}}
+                return self.session.post(f"{tournament_url}/rooms/{room_id}/scores", json=body, timeout=10)
+            
+            def top():
+                return [(entry["name"], entry["score"], entry["rank"])
+                        for entry in self.session.get(f"{tournament_url}/top", params={"limit": 10}, timeout=10).json()["standings"]]
+            
+            # Player ids repeat across rooms on purpose: they are different players
+            report("room-a", {"p1": ("Ann", 30), "p2": ("Bob", 20)})
+            report("room-b", {"p1": ("Cid", 20), "p3": ("Dee", 10)})
+            standings = top()
+            expected = [("Ann", 30, 1), ("Bob", 20, 2), ("Cid", 20, 2), ("Dee", 10, 4)]
+            if sorted(standings) != sorted(expected) or [rank for _, _, rank in standings] != [1, 2, 2, 4]:
+                self.log_test("Tournament APIs", False, f"Tied players should share a rank: {standings}")
+                return False
+            
+            rank_response = self.session.get(f"{tournament_url}/rank/p1", params={"room_id": "room-b"}, timeout=10)
+            if rank_response.status_code != 200 or rank_response.json()["standing"]["rank"] != 2:
+                self.log_test("Tournament APIs", False, f"Rank of a tied player should be 2: {rank_response.text}")
+                return False
+            
+            # Reports carry absolute scores, so resending one is harmless and an update re-ranks
+            report("room-a", {"p2": ("Bob", 25)})
+            report("room-a", {"p2": ("Bob", 25)})
+            standings = top()
+            if standings != [("Ann", 30, 1), ("Bob", 25, 2), ("Cid", 20, 3), ("Dee", 10, 4)]:
+                self.log_test("Tournament APIs", False, f"Standings after update are wrong: {standings}")
+                return False
+            
+            missing_response = self.session.get(f"{tournament_url}/rank/nobody", params={"room_id": "room-a"}, timeout=10)
+            if missing_response.status_code != 404:
+                self.log_test("Tournament APIs", False, f"Unranked player should give 404, got {missing_response.status_code}")
+                return False
+            
+            summary = self.session.get(tournament_url, timeout=10).json()
+            if summary["rooms"] != ["room-a", "room-b"] or summary["players"] != 4:
+                self.log_test("Tournament APIs", False, f"Unexpected summary: {summary}")
+                return False
+            
+            unknown_response = self.session.get(f"{API_BASE}/tournaments/does-not-exist/top", timeout=10)
+            if unknown_response.status_code != 404:
+                self.log_test("Tournament APIs", False, f"Unknown tournament should give 404, got {unknown_response.status_code}")
+                return False
+            
+            self.log_test("Tournament APIs", True, "Scores merged from two rooms, ties share a rank, updates re-rank")
+            return True
+            
+        except Exception as e:
+            self.log_test("Tournament APIs", False, f"Error: {str(e)}")
+            return False
+    
+    def test_quiz_state_etag_long_poll(self):
+        """Test conditional GET and long-polling on /quiz-state"""
+        try:
+            state_response = self.session.get(f"{API_BASE}/quiz-state", timeout=10)
+            etag = state_response.headers.get("ETag")
+            if state_response.status_code != 200 or not etag:
+                self.log_test("Quiz State ETag", False, f"Expected 200 with an ETag, got {state_response.status_code} {etag}")
+                return False
+            
+            cached_response = self.session.get(f"{API_BASE}/quiz-state", headers={"If-None-Match": etag}, timeout=10)
+            if cached_response.status_code != 304 or cached_response.headers.get("ETag") != etag:
+                self.log_test("Quiz State ETag", False, f"Unchanged state should give 304, got {cached_response.status_code}")
+                return False
+            
+            # Nothing changes: the long-poll is held for the whole wait, then answers 304
+            started = time.time()
+            timeout_response = self.session.get(f"{API_BASE}/quiz-state", params={"wait": 1},
+                                                headers={"If-None-Match": etag}, timeout=10)
+            elapsed = time.time() - started
+            if timeout_response.status_code != 304 or elapsed < 0.9:
+                self.log_test("Quiz State Long-Poll", False, f"Expected 304 after ~1s, got {timeout_response.status_code} after {elapsed:.2f}s")
+                return False
+            
+            # An upload while the poll is held must wake it up with the new state
+            excel_bytes = self.create_test_excel().getvalue()
+            files = {'file': ('test_quiz.xlsx', excel_bytes, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
+            
+            def upload_later():
+                time.sleep(1)
+                requests.post(f"{API_BASE}/upload-excel", files=files, timeout=15)
+            
+            uploader = threading.Thread(target=upload_later)
+            uploader.start()
+            started = time.time()
+            changed_response = self.session.get(f"{API_BASE}/quiz-state", params={"wait": 20},
+                                                headers={"If-None-Match": etag}, timeout=30)
+            elapsed = time.time() - started
+            uploader.join()
+            if changed_response.status_code != 200 or changed_response.headers.get("ETag") == etag or elapsed >= 15:
+                self.log_test("Quiz State Long-Poll", False, f"Expected 200 with a new ETag on change, got "
+                              f"{changed_response.status_code} after {elapsed:.2f}s")
+                return False
+            
+            self.log_test("Quiz State ETag", True, "Unchanged state answered with 304")
+            self.log_test("Quiz State Long-Poll", True, f"Held poll timed out with 304 and woke up {elapsed:.2f}s in on a change")
+            return True
+            
+        except Exception as e:
+            self.log_test("Quiz State Long-Poll", False, f"Error: {str(e)}")
+            return False
+    
+    def test_journal_recovery(self):
+        """Test that a journal rebuilds the same state from its snapshot and from scratch"""
+        backend_dir = Path(__file__).resolve().parent / "backend"
+        if not (backend_dir / "server.py").exists():
+            print("⏭️  SKIP Journal Recovery: needs the backend sources next to this script")
+            return True
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                child = subprocess.run([sys.executable, "-c", JOURNAL_RECOVERY_SCRIPT, directory, str(backend_dir)],
+                                       capture_output=True, text=True, timeout=60)
+                if child.returncode != 0:
+                    self.log_test("Journal Recovery", False, f"Recording script failed: {child.stderr.strip()[-500:]}")
+                    return False
+                result = json.loads(child.stdout.strip().splitlines()[-1])
+                
+                # The snapshot must fall inside the session, with a leave_batch left in the tail to replay
+                if not 0 < result["snapshot_seq"] < result["events"] or result["segments"] < 2:
+                    self.log_test("Journal Recovery", False, f"Expected a snapshot boundary inside the session: {result['snapshot_seq']} "
+                                  f"of {result['events']} events, {result['segments']} segments")
+                    return False
+                if "leave_batch" not in result["tail"] or result["replayed_from_snapshot"] != len(result["tail"]):
+                    self.log_test("Journal Recovery", False, f"Recovery should replay the tail after the snapshot: {result['tail']}")
+                    return False
+                for name in ("recovered", "replayed"):
+                    if result[name] != result["expected"]:
+                        mismatched = [key for key in result["expected"] if result[name][key] != result["expected"][key]]
+                        self.log_test("Journal Recovery", False, f"State {name} from the journal differs in {mismatched}")
+                        return False
+                
+                # The offline replay tool must agree with itself from the snapshot and from the start
+                outputs = []
+                for extra in ([], ["--from-snapshot"]):
+                    replay = subprocess.run([sys.executable, str(backend_dir / "replay_journal.py"), directory, *extra],
+                                            capture_output=True, text=True, timeout=60)
+                    outputs.append(replay.stdout.splitlines()[1:])  # drop the timing line
+                if replay.returncode != 0 or not outputs[0] or outputs[0] != outputs[1]:
+                    self.log_test("Journal Recovery", False, f"replay_journal.py output differs: {outputs}")
+                    return False
+            
+            self.log_test("Journal Recovery", True, f"Snapshot at event {result['snapshot_seq']} plus {len(result['tail'])} tail events "
+                          f"and a full replay of {result['events']} events both rebuilt the recorded state")
+            return True
+            
+        except Exception as e:
+            self.log_test("Journal Recovery", False, f"Error: {str(e)}")
+            return False
+    
+    def test_admin_logging_apis(self):
+        """Test runtime log level and sampling changes, their validation and request id echoing"""
+        try:
+            original = self.session.get(f"{API_BASE}/admin/logging", timeout=10).json()
+            if not {"level", "sample_rates", "sampled_out", "queue_dropped", "queue_size"} <= set(original):
+                self.log_test("Admin Logging APIs", False, f"Logging config missing fields: {original}")
+                return False
+            
+            try:
+                level_response = self.session.post(f"{API_BASE}/admin/log-level", json={"level": "debug"}, timeout=10)
+                current = self.session.get(f"{API_BASE}/admin/logging", timeout=10).json()
+                if level_response.status_code != 200 or level_response.json()["level"] != "DEBUG" or current["level"] != "DEBUG":
+                    self.log_test("Admin Logging APIs", False, f"Log level did not change: {level_response.text}, now {current['level']}")
+                    return False
+                
+                sampling_response = self.session.post(f"{API_BASE}/admin/log-sampling", json={"rates": {"answer": 0.5}}, timeout=10)
+                current = self.session.get(f"{API_BASE}/admin/logging", timeout=10).json()
+                if sampling_response.status_code != 200 or current["sample_rates"].get("answer") != 0.5:
+                    self.log_test("Admin Logging APIs", False, f"Sample rate did not change: {sampling_response.text}")
+                    return False
+            finally:
+                self.session.post(f"{API_BASE}/admin/log-level", json={"level": original["level"]}, timeout=10)
+                self.session.post(f"{API_BASE}/admin/log-sampling", json={"rates": original["sample_rates"]}, timeout=10)
+            
+            unknown_response = self.session.post(f"{API_BASE}/admin/log-level", json={"level": "LOUD"}, timeout=10)
+            if unknown_response.status_code != 400:
+                self.log_test("Admin Logging APIs", False, f"Unknown level should give 400, got {unknown_response.status_code}")
+                return False
+            
+            for rate in (1.5, -0.1):
+                rate_response = self.session.post(f"{API_BASE}/admin/log-sampling", json={"rates": {"answer": rate}}, timeout=10)
+                if rate_response.status_code != 400:
+                    self.log_test("Admin Logging APIs", False, f"Sample rate {rate} should give 400, got {rate_response.status_code}")
+                    return False
+            
+            restored = self.session.get(f"{API_BASE}/admin/logging", timeout=10).json()
+            if restored["level"] != original["level"] or restored["sample_rates"] != original["sample_rates"]:
+                self.log_test("Admin Logging APIs", False, f"Rejected updates changed the config: {restored}")
+                return False
+            
+            # A caller's request id is echoed back, and one is made up when none is sent
+            echoed = self.session.get(f"{API_BASE}/", headers={"X-Request-ID": "test-request-42"}, timeout=10)
+            generated = self.session.get(f"{API_BASE}/", timeout=10)
+            if echoed.headers.get("X-Request-ID") != "test-request-42" or not generated.headers.get("X-Request-ID"):
+                self.log_test("Admin Logging APIs", False, f"X-Request-ID not echoed: {echoed.headers.get('X-Request-ID')}, "
+                              f"{generated.headers.get('X-Request-ID')}")
+                return False
+            
+            self.log_test("Admin Logging APIs", True, "Level and sample rates changed at runtime, invalid values rejected, request ids echoed")
+            return True
+            
+        except Exception as e:
+            self.log_test("Admin Logging APIs", False, f"Error: {str(e)}")
+            return False
+    
+    def join_vanishing_players(self, count, round_number):
+        """Join players from a child process, then kill it so their connections drop without a disconnect"""
+        child = subprocess.Popen([sys.executable, "-c", VANISHING_PLAYERS_SCRIPT, BACKEND_URL, str(count), f"Soak Player {round_number}"],
+                                 stdout=subprocess.PIPE, text=True)
+        try:
+            child.stdout.readline()  # "joined"
+        finally:
+            child.kill()
+            child.wait()
+    
+    def wait_for(self, condition, timeout, interval=0.5):
+        """Poll condition() until it returns a truthy value or timeout seconds pass"""
+        deadline = time.time() + timeout
+        while True:
+            result = condition()
+            if result or time.time() > deadline:
+                return result
+            time.sleep(interval)
+    
+    def test_session_lifecycle_soak(self, rounds=200, vanishing_players=5, zombie_timeout=90):
+        """Run many quizzes back to back with players that vanish, and check the server cleans up.
+        
+        Opt-in with SOAK_TEST=1: it takes a few minutes and needs a server started
+        with short lifetimes so eviction and job pruning happen during the run,
+        e.g. SESSION_TTL=1 SWEEP_INTERVAL=0.5 JOB_RETENTION=5. Vanished players are
+        only noticed once Socket.IO's ping timeout expires, hence zombie_timeout.
+        """
+        if os.getenv('SOAK_TEST') != '1':
+            print("⏭️  SKIP Session Lifecycle Soak: set SOAK_TEST=1 to run it")
+            return True
+        
+        limits = self.session.get(f"{API_BASE}/sessions/memory", timeout=10).json()["limits"]
+        if limits["session_ttl"] > 10:
+            print(f"⏭️  SKIP Session Lifecycle Soak: server SESSION_TTL is {limits['session_ttl']}s, start it with a short one")
+            return True
+        session_ttl = limits["session_ttl"]
+        sweep_interval = limits["sweep_interval"]
+        job_retention = limits["job_retention"]
+        
+        def quiz_state():
+            return self.session.get(f"{API_BASE}/quiz-state", timeout=10).json()
+        
+        def memory():
+            return self.session.get(f"{API_BASE}/sessions/memory", timeout=10).json()
+        
+        def evicted():
+            state = quiz_state()
+            return state["total_questions"] == 0 and state["status"] == "waiting"
+        
+        try:
+            excel_bytes = self.create_test_excel().getvalue()
+            files = {'file': ('test_quiz.xlsx', excel_bytes, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
+            samples = []
+            upload_times = []
+            joined = 0
+            
+            for round_number in range(rounds):
+                upload_response = self.session.post(f"{API_BASE}/upload-excel", files=files, timeout=15)
+                upload_times.append(time.time())
+                if upload_response.status_code != 200:
+                    self.log_test("Session Lifecycle Soak", False, f"Upload failed in round {round_number}: {upload_response.status_code}")
+                    return False
+                
+                checkpoint = round_number % 20 == 0 or round_number == rounds - 1
+                if checkpoint:
+                    self.join_vanishing_players(vanishing_players, round_number)
+                    joined += vanishing_players
+                
+                self.session.post(f"{API_BASE}/start-quiz", timeout=10)
+                # Advance until the quiz reports it is finished
+                for _ in range(10):
+                    next_response = self.session.post(f"{API_BASE}/next-question", timeout=10)
+                    if next_response.status_code != 200 or next_response.json().get("message") == "Quiz finished":
+                        break
+                
+                if not checkpoint:
+                    continue
+                
+                # The finished session must be evicted once SESSION_TTL has passed
+                if not self.wait_for(evicted, session_ttl + 2 * sweep_interval + 10):
+                    state = quiz_state()
+                    self.log_test("Session Lifecycle Soak", False, f"Round {round_number}: finished session was not evicted "
+                                  f"(status {state['status']}, {state['total_questions']} questions) within SESSION_TTL={session_ttl}s")
+                    return False
+                
+                sample = memory()
+                # Jobs older than JOB_RETENTION must have been pruned by the sweep
+                recent_jobs = sum(1 for uploaded in upload_times if uploaded > time.time() - job_retention - 2 * sweep_interval)
+                if sample["jobs_retained"] > recent_jobs + 5:
+                    self.log_test("Session Lifecycle Soak", False, f"Round {round_number}: {sample['jobs_retained']} jobs retained, "
+                                  f"expected at most {recent_jobs + 5} with JOB_RETENTION={job_retention}")
+                    return False
+                samples.append(sample)
+            
+            # Every vanished player must eventually be dropped
+            players_left = self.wait_for(lambda: memory()["players"] == 0, zombie_timeout, interval=2)
+            if not players_left:
+                self.log_test("Session Lifecycle Soak", False, f"{memory()['players']} of {joined} vanished players still registered after {zombie_timeout}s")
+                return False
+            
+            samples.append(memory())
+            # Skip the first sample: it may predate the first finished session. The
+            # last one is taken once every vanished player is gone, so it may only shrink
+            baseline = samples[1]["bytes"]["total"]
+            final = samples[-1]["bytes"]["total"]
+            if final > baseline * 1.1:
+                self.log_test("Session Lifecycle Soak", False, f"Session memory grew from {baseline} to {final} bytes over {rounds} quizzes")
+                return False
+            
+            rss_growth = ""
+            if samples[1].get("process_rss_bytes") and samples[-1].get("process_rss_bytes"):
+                growth_mb = (samples[-1]["process_rss_bytes"] - samples[1]["process_rss_bytes"]) / 1024 / 1024
+                rss_growth = f", process RSS changed by {growth_mb:.1f} MB"
+            
+            self.log_test("Session Lifecycle Soak", True, f"Sessions evicted, {joined} vanished players dropped and memory stayed flat "
+                          f"over {rounds} quizzes ({baseline} -> {final} bytes{rss_growth})")
+            return True
+            
+        except Exception as e:
+            self.log_test("Session Lifecycle Soak", False, f"Error: {str(e)}")
+            return False
+    
     async def test_socketio_connection(self):
         """Test Socket.IO connection and real-time messaging"""
         try:
@@ -419,6 +939,189 @@ class BackendTester:
             self.log_test("Socket.IO Connection", False, f"Socket.IO connection failed: {error_msg}")
             return False
     
+    async def test_self_paced_mode(self):
+        """Test per-player cursors, deadlines, stale answers and finishing in self-paced mode"""
+        clients = []
+        try:
+            # The second question times out quickly so its deadline can be watched expiring
+            excel_file = self.create_test_excel(durations=(30, 1))
+            files = {'file': ('test_quiz.xlsx', excel_file.getvalue(), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
+            if self.session.post(f"{API_BASE}/upload-excel", files=files, timeout=15).status_code != 200:
+                self.log_test("Self-Paced Mode", False, "Failed to upload questions for testing")
+                return False
+            
+            async def join(name):
+                client = socketio.AsyncClient(reconnection=False)
+                events = []
+                client.on('*', lambda event, data=None: events.append((event, data)))
+                await client.connect(BACKEND_URL, transports=['polling'])
+                clients.append(client)
+                await client.emit('join_player', {'name': name})
+                return client, events
+            
+            async def wait_event(events, name, count=1, timeout=10):
+                deadline = time.time() + timeout
+                while time.time() < deadline:
+                    received = [data for event, data in events if event == name]
+                    if len(received) >= count:
+                        return received[count - 1]
+                    await asyncio.sleep(0.1)
+                return None
+            
+            def progress():
+                return self.session.get(f"{API_BASE}/progress", timeout=10).json()
+            
+            ann, ann_events = await join("Self-Paced Ann")
+            bob, bob_events = await join("Self-Paced Bob")
+            await asyncio.sleep(1)
+            
+            start_response = self.session.post(f"{API_BASE}/start-quiz", params={"mode": "self_paced"}, timeout=10)
+            if start_response.status_code != 200:
+                self.log_test("Self-Paced Mode", False, f"Start quiz failed: {start_response.status_code}")
+                return False
+            first = await wait_event(ann_events, 'question')
+            if first is None or first["question_number"] != 1 or await wait_event(bob_events, 'question') is None:
+                self.log_test("Self-Paced Mode", False, f"Both players should get question 1, got {first}")
+                return False
+            
+            # Ann answers on her own and moves ahead while Bob stays on question 1
+            await ann.emit('submit_answer', {'answer': 'B', 'question_number': 1})
+            feedback = await wait_event(ann_events, 'answer_feedback')
+            second = await wait_event(ann_events, 'question', count=2)
+            if feedback is None or not feedback["correct"] or second is None or second["question_number"] != 2:
+                self.log_test("Self-Paced Mode", False, f"Ann should be scored and moved to question 2: {feedback}, {second}")
+                return False
+            stats = progress()
+            if stats["mode"] != "self_paced" or stats["at_question"] != [1, 1] or stats["finished"] != 0:
+                self.log_test("Self-Paced Mode", False, f"Cursors should be split across the questions: {stats}")
+                return False
+            
+            # A late answer for question 1 must not be scored against question 2
+            await ann.emit('submit_answer', {'answer': 'B', 'question_number': 1})
+            await asyncio.sleep(1)
+            if len([event for event, _ in ann_events if event == 'answer_feedback']) != 1 or progress()["at_question"] != [1, 1]:
+                self.log_test("Self-Paced Mode", False, "An answer for a stale question number was scored")
+                return False
+            
+            # Question 2 lasts 1s: its deadline skips Ann past it, which finishes her
+            timeout_event = await wait_event(ann_events, 'question_timeout')
+            finished_event = await wait_event(ann_events, 'player_finished')
+            if timeout_event is None or timeout_event["question_number"] != 2 or finished_event is None or finished_event["score"] != 10:
+                self.log_test("Self-Paced Mode", False, f"Deadline should expire question 2: {timeout_event}, {finished_event}")
+                return False
+            stats = progress()
+            if stats["at_question"] != [1, 0] or stats["finished"] != 1 or stats["status"] != "active":
+                self.log_test("Self-Paced Mode", False, f"Quiz should go on while Bob is unfinished: {stats}")
+                return False
+            
+            # Resuming hands Bob his current question again
+            self.session.post(f"{API_BASE}/pause-quiz", timeout=10)
+            resume_response = self.session.post(f"{API_BASE}/resume-quiz", timeout=10)
+            resent = await wait_event(bob_events, 'question', count=2)
+            if resume_response.json().get("message") != "Quiz resumed" or resent is None or resent["question_number"] != 1:
+                self.log_test("Self-Paced Mode", False, f"Resume should resend question 1 to Bob: {resume_response.text}, {resent}")
+                return False
+            
+            # Bob leaves during a pause: everyone left is done, so resuming finishes the quiz
+            self.session.post(f"{API_BASE}/pause-quiz", timeout=10)
+            await bob.disconnect()
+            await asyncio.sleep(1)
+            resume_response = self.session.post(f"{API_BASE}/resume-quiz", timeout=10)
+            quiz_finished = await wait_event(ann_events, 'quiz_finished')
+            state = self.session.get(f"{API_BASE}/quiz-state", timeout=10).json()
+            if resume_response.json().get("message") != "Quiz finished" or quiz_finished is None or state["status"] != "finished":
+                self.log_test("Self-Paced Mode", False, f"Quiz should finish on resume: {resume_response.text}, status {state['status']}")
+                return False
+            
+            self.log_test("Self-Paced Mode", True, "Players advanced independently, stale answers were ignored, "
+                          "deadlines expired and the quiz finished once everyone left was done")
+            return True
+            
+        except Exception as e:
+            self.log_test("Self-Paced Mode", False, f"Error: {str(e)}")
+            return False
+        finally:
+            for client in clients:
+                if client.connected:
+                    await client.disconnect()
+    
+    async def test_team_aggregates(self):
+        """Test team totals, averages and tied ranks in /scores as players answer and leave"""
+        clients = {}
+        try:
+            excel_file = self.create_test_excel()
+            files = {'file': ('test_quiz.xlsx', excel_file.getvalue(), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
+            if self.session.post(f"{API_BASE}/upload-excel", files=files, timeout=15).status_code != 200:
+                self.log_test("Team Aggregates", False, "Failed to upload questions for testing")
+                return False
+            
+            for name, team in [("Ann", "Red"), ("Bob", " Red "), ("Cid", "Blue"), ("Dee", None)]:
+                client = socketio.AsyncClient(reconnection=False)
+                await client.connect(BACKEND_URL, transports=['polling'])
+                await client.emit('join_player', {'name': f"Team {name}", 'team': team})
+                clients[name] = client
+            
+            def teams():
+                return [(entry["team"], entry["total"], entry["members"], entry["average"], entry["rank"])
+                        for entry in self.session.get(f"{API_BASE}/scores", timeout=10).json()["teams"]]
+            
+            async def wait_for_teams(expected, timeout=10):
+                deadline = time.time() + timeout
+                while sorted(teams()) != sorted(expected) and time.time() < deadline:
+                    await asyncio.sleep(0.2)
+                return teams()
+            
+            # Padding around a team name is dropped, and players without a team are left out
+            standings = await wait_for_teams([("Red", 0, 2, 0.0, 1), ("Blue", 0, 1, 0.0, 1)])
+            if sorted(standings) != sorted([("Red", 0, 2, 0.0, 1), ("Blue", 0, 1, 0.0, 1)]):
+                self.log_test("Team Aggregates", False, f"Unexpected teams after joining: {standings}")
+                return False
+            
+            if self.session.post(f"{API_BASE}/start-quiz", timeout=10).status_code != 200:
+                self.log_test("Team Aggregates", False, "Failed to start the quiz")
+                return False
+            await asyncio.sleep(1)
+            
+            # Question 1 is worth 10: Ann and Cid are right, Bob is wrong, so the teams tie on total
+            await clients["Ann"].emit('submit_answer', {'answer': 'B', 'question_number': 1})
+            await clients["Bob"].emit('submit_answer', {'answer': 'A', 'question_number': 1})
+            await clients["Cid"].emit('submit_answer', {'answer': 'B', 'question_number': 1})
+            await clients["Dee"].emit('submit_answer', {'answer': 'B', 'question_number': 1})
+            expected = [("Red", 10, 2, 5.0, 1), ("Blue", 10, 1, 10.0, 1)]
+            standings = await wait_for_teams(expected)
+            if sorted(standings) != sorted(expected):
+                self.log_test("Team Aggregates", False, f"Tied teams should share rank 1 with per-member averages: {standings}")
+                return False
+            
+            # Ann's points leave with her
+            await clients.pop("Ann").disconnect()
+            expected = [("Blue", 10, 1, 10.0, 1), ("Red", 0, 1, 0.0, 2)]
+            standings = await wait_for_teams(expected)
+            if standings != expected:
+                self.log_test("Team Aggregates", False, f"Team totals should drop a member who left: {standings}")
+                return False
+            
+            # Question 2 is worth 15 and puts Red back ahead
+            self.session.post(f"{API_BASE}/next-question", timeout=10)
+            await asyncio.sleep(0.5)
+            await clients["Bob"].emit('submit_answer', {'answer': 'C', 'question_number': 2})
+            expected = [("Red", 15, 1, 15.0, 1), ("Blue", 10, 1, 10.0, 2)]
+            standings = await wait_for_teams(expected)
+            if standings != expected:
+                self.log_test("Team Aggregates", False, f"Teams should re-rank after a later answer: {standings}")
+                return False
+            
+            self.log_test("Team Aggregates", True, "Team totals, averages and shared ranks tracked answers and departures")
+            return True
+            
+        except Exception as e:
+            self.log_test("Team Aggregates", False, f"Error: {str(e)}")
+            return False
+        finally:
+            for client in clients.values():
+                if client.connected:
+                    await client.disconnect()
+    
     def run_all_tests(self):
         """Run all backend tests"""
         print("=" * 60)
@@ -437,8 +1140,14 @@ class BackendTester:
             self.test_qr_code_generation,
             self.test_template_excel_download,
             self.test_excel_upload_processing,
+            self.test_job_apis,
             self.test_quiz_management_apis,
             self.test_socketio_server_configuration,
+            self.test_tournament_apis,
+            self.test_quiz_state_etag_long_poll,
+            self.test_journal_recovery,
+            self.test_admin_logging_apis,
+            self.test_session_lifecycle_soak,
         ]
         
         for test in tests:
@@ -452,6 +1161,18 @@ class BackendTester:
         except Exception as e:
             self.log_test("Socket.IO Connection", False, f"Socket.IO test failed: {str(e)}")
         
+        print("\nTesting self-paced mode...")
+        try:
+            asyncio.run(self.test_self_paced_mode())
+        except Exception as e:
+            self.log_test("Self-Paced Mode", False, f"Self-paced test failed: {str(e)}")
+        
+        print("\nTesting team aggregates...")
+        try:
+            asyncio.run(self.test_team_aggregates())
+        except Exception as e:
+            self.log_test("Team Aggregates", False, f"Team aggregates test failed: {str(e)}")
+        
         # Summary
         print("\n" + "=" * 60)
         print("TEST SUMMARY")
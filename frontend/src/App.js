@@ -10,10 +10,81 @@ const API = `${BACKEND_URL}/api`;
 // WebSocket connection
 let socket = null;
 
+// Masked questions pushed ahead of a synchronized reveal, by question number
+const prefetchedQuestions = {};
+
+const base64ToBytes = (value) => Uint8Array.from(atob(value), (c) => c.charCodeAt(0));
+
+// SHA-256, for the question keystream: plain-http LAN pages get no WebCrypto
+const SHA256_K = new Uint32Array([
+  0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+  0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+  0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+  0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+  0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+  0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+  0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+  0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+]);
+
+const rotr = (x, n) => (x >>> n) | (x << (32 - n));
+
+const sha256 = (message) => {
+  const padded = new Uint8Array(((message.length + 72) >> 6) << 6);
+  padded.set(message);
+  padded[message.length] = 0x80;
+  const view = new DataView(padded.buffer);
+  view.setUint32(padded.length - 4, message.length * 8);
+  const hash = new Uint32Array([0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19]);
+  const w = new Uint32Array(64);
+  for (let offset = 0; offset < padded.length; offset += 64) {
+    for (let i = 0; i < 16; i++) w[i] = view.getUint32(offset + i * 4);
+    for (let i = 16; i < 64; i++) {
+      const s0 = rotr(w[i - 15], 7) ^ rotr(w[i - 15], 18) ^ (w[i - 15] >>> 3);
+      const s1 = rotr(w[i - 2], 17) ^ rotr(w[i - 2], 19) ^ (w[i - 2] >>> 10);
+      w[i] = w[i - 16] + s0 + w[i - 7] + s1;
+    }
+    let [a, b, c, d, e, f, g, h] = hash;
+    for (let i = 0; i < 64; i++) {
+      const t1 = (h + (rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25)) + ((e & f) ^ (~e & g)) + SHA256_K[i] + w[i]) >>> 0;
+      const t2 = ((rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22)) + ((a & b) ^ (a & c) ^ (b & c))) >>> 0;
+      h = g;
+      g = f;
+      f = e;
+      e = (d + t1) >>> 0;
+      d = c;
+      c = b;
+      b = a;
+      a = (t1 + t2) >>> 0;
+    }
+    [a, b, c, d, e, f, g, h].forEach((value, i) => { hash[i] += value; });
+  }
+  const digest = new Uint8Array(32);
+  const digestView = new DataView(digest.buffer);
+  hash.forEach((value, i) => digestView.setUint32(i * 4, value));
+  return digest;
+};
+
+// Same keystream as question_keystream on the server: block i is SHA-256(key || i)
+const unmaskQuestion = (prefetched, key) => {
+  const keyBytes = base64ToBytes(key);
+  const block = new Uint8Array(keyBytes.length + 4);
+  block.set(keyBytes);
+  const bytes = base64ToBytes(prefetched.d);
+  for (let i = 0; i < bytes.length; i += 32) {
+    new DataView(block.buffer).setUint32(keyBytes.length, i / 32);
+    const stream = sha256(block);
+    for (let j = 0; j < 32 && i + j < bytes.length; j++) {
+      bytes[i + j] ^= stream[j];
+    }
+  }
+  return JSON.parse(new TextDecoder().decode(bytes));
+};
+
 const HostPage = () => {
   const [qrCode, setQrCode] = useState("");
   const [quizState, setQuizState] = useState({ status: "waiting", players: [] });
-  const [questions, setQuestions] = useState([]);
+  const [questionCount, setQuestionCount] = useState(0);
   const [loading, setLoading] = useState(false);
 
   useEffect(() => {
@@ -28,7 +99,7 @@ const HostPage = () => {
     });
     
     socket.on("questions_loaded", (data) => {
-      setQuestions(data.questions);
+      setQuestionCount(data.count);
       alert(`Successfully loaded ${data.count} questions!`);
     });
     
@@ -168,8 +239,8 @@ const HostPage = () => {
             />
             {loading && <span className="loading">Chargement...</span>}
           </div>
-          {questions.length > 0 && (
-            <p className="questions-info">✅ {questions.length} questions chargées</p>
+          {questionCount > 0 && (
+            <p className="questions-info">✅ {questionCount} questions chargées</p>
           )}
         </div>
 
@@ -180,7 +251,7 @@ const HostPage = () => {
               <button 
                 onClick={startQuiz} 
                 className="btn btn-primary"
-                disabled={questions.length === 0}
+                disabled={questionCount === 0}
               >
                 🚀 Démarrer le quiz
               </button>
@@ -233,8 +304,10 @@ const HostPage = () => {
 
 const JoinPage = () => {
   const [playerName, setPlayerName] = useState("");
+  const [teamName, setTeamName] = useState("");
   const [gameState, setGameState] = useState("name_entry"); // name_entry, lobby, playing, finished
   const [currentQuestion, setCurrentQuestion] = useState(null);
+  const [questionNumber, setQuestionNumber] = useState(null);
   const [feedback, setFeedback] = useState(null);
   const [playerScore, setPlayerScore] = useState(0);
   const [timeLeft, setTimeLeft] = useState(0);
@@ -252,8 +325,10 @@ const JoinPage = () => {
       setGameState("playing");
     });
 
-    socket.on("question", (data) => {
+    const showQuestion = (data) => {
+      socket.emit("reveal_ack", { n: data.question_number });
       setCurrentQuestion(data.question);
+      setQuestionNumber(data.question_number);
       setTimeLeft(data.question.duration);
       setHasAnswered(false);
       setFeedback(null);
@@ -268,6 +343,29 @@ const JoinPage = () => {
           return prev - 1;
         });
       }, 1000);
+    };
+
+    socket.on("question", showQuestion);
+
+    socket.on("question_prefetch", (data) => {
+      prefetchedQuestions[data.n] = data;
+    });
+
+    socket.on("question_reveal", (data) => {
+      const prefetched = prefetchedQuestions[data.n];
+      delete prefetchedQuestions[data.n];
+      if (prefetched) {
+        try {
+          showQuestion(unmaskQuestion(prefetched, data.k));
+          return;
+        } catch (error) {
+          console.error("Error unmasking question:", error);
+        }
+      }
+      // Missed the prefetch (joined or reconnected in between): ask for it
+      socket.emit("question_fetch", { n: data.n }, (payload) => {
+        if (payload.question) showQuestion(payload);
+      });
     });
 
     socket.on("answer_feedback", (data) => {
@@ -286,7 +384,7 @@ const JoinPage = () => {
 
   const joinGame = () => {
     if (playerName.trim()) {
-      socket.emit("join_player", { name: playerName.trim() });
+      socket.emit("join_player", { name: playerName.trim(), team: teamName.trim() || null });
       setGameState("lobby");
     }
   };
@@ -294,7 +392,8 @@ const JoinPage = () => {
   const submitAnswer = (answer) => {
     if (!hasAnswered && timeLeft > 0) {
       setHasAnswered(true);
-      socket.emit("submit_answer", { answer });
+      // The server ignores the answer if it arrives after the question moved on
+      socket.emit("submit_answer", { answer, question_number: questionNumber });
     }
   };
 
@@ -313,6 +412,15 @@ const JoinPage = () => {
               className="name-input"
               onKeyPress={(e) => e.key === 'Enter' && joinGame()}
             />
+            <input
+              type="text"
+              value={teamName}
+              onChange={(e) => setTeamName(e.target.value)}
+              placeholder="Votre équipe (optionnel)..."
+              className="name-input"
+              maxLength={50}
+              onKeyPress={(e) => e.key === 'Enter' && joinGame()}
+            />
             <button onClick={joinGame} className="btn btn-primary">
               🚀 Rejoindre le quiz
             </button>